@@ -9,8 +9,9 @@ from pyrogram import idle
 from WebStreamer import utils
 from WebStreamer import StreamBot
 from WebStreamer.server import web_server
+from WebStreamer.bot import multi_clients
 from WebStreamer.bot.clients import initialize_clients
-from WebStreamer.bot.database import init_db
+from WebStreamer.bot.database import close_db, init_db
 from WebStreamer.bot.config import config
 
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -41,6 +42,16 @@ logging.getLogger("aiohttp.web").setLevel(logging.ERROR)
 
 loop = asyncio.get_event_loop()
 
+async def prewarm_media_sessions():
+    dc_ids = await utils.get_link_dc_ids()
+    log.info(f"Pre-warming media sessions for DCs {sorted(dc_ids)}")
+    try:
+        await asyncio.wait_for(
+            utils.streamers.prewarm(list(multi_clients.values()), dc_ids), Var.PREWARM_TIMEOUT
+        )
+    except asyncio.TimeoutError:
+        log.warning(f"Pre-warming media sessions took over {Var.PREWARM_TIMEOUT}s; the rest will open on demand")
+
 async def start_services():
     log.info("-------------------- STARTING BOT --------------------")
     log.info(f"Log file is at: {LOG_FILE_PATH}")
@@ -67,8 +78,16 @@ async def start_services():
     site = web.TCPSite(runner, Var.BIND_ADDRESS, Var.PORT)
     await site.start()
     log.info(f"Web server started at http://{Var.BIND_ADDRESS}:{Var.PORT}")
+
+    # Runs after the server is bound so a slow DC handshake can't hold up
+    # startup; streams arriving meanwhile open their sessions on demand.
+    prewarm_task = asyncio.create_task(prewarm_media_sessions()) if Var.PREWARM_MEDIA_SESSIONS else None
     await idle()
+    if prewarm_task is not None:
+        prewarm_task.cancel()
     await runner.cleanup()
+    await utils.streamers.close()
+    await close_db()
 
 if __name__ == "__main__":
     try:
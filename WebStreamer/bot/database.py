@@ -1,9 +1,14 @@
 # WebStreamer/bot/database.py
+import re
+import asyncio
 import logging
 import aiosqlite
 import datetime
 import sqlite3
-from typing import Optional
+import time
+import contextlib
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from WebStreamer.vars import Var
 from WebStreamer.bot.i18n import user_lang_cache, lock
 
@@ -18,6 +23,329 @@ def _ensure_utc(dt: Optional[datetime.datetime]) -> Optional[datetime.datetime]:
     return dt.astimezone(datetime.timezone.utc)
 
 
+# sqlite3 keeps this many prepared statements per connection; with pooled
+# connections the cache survives between calls, so size it for every query.
+STATEMENT_CACHE_SIZE = 256
+
+
+def _connect() -> aiosqlite.Connection:
+    return aiosqlite.connect(DB_PATH, detect_types=DETECT_TYPES, cached_statements=STATEMENT_CACHE_SIZE)
+
+
+class ConnectionPool:
+    """Long-lived connections: one writer and a few readers.
+
+    SQLite only allows one writer at a time, so writes share a single
+    connection behind a lock; WAL lets the readers run alongside it.
+    Before ``open`` (or after ``close``) every call gets a short-lived
+    connection instead, like scripts that import this module expect.
+    """
+
+    def __init__(self, readers: int):
+        self.size = max(readers, 1)
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._write_lock = asyncio.Lock()
+        self._readers: List[aiosqlite.Connection] = []
+        self._idle: Optional[asyncio.Queue] = None
+
+    async def open(self) -> None:
+        if self._writer is not None:
+            return
+        self._writer = await self._open_connection()
+        self._idle = asyncio.Queue()
+        for _ in range(self.size):
+            reader = await self._open_connection()
+            self._readers.append(reader)
+            self._idle.put_nowait(reader)
+        logging.info(f"Database pool opened with 1 writer and {self.size} readers.")
+
+    @staticmethod
+    async def _open_connection() -> aiosqlite.Connection:
+        db = await _connect()
+        await db.execute("PRAGMA busy_timeout = 5000")
+        return db
+
+    async def close(self) -> None:
+        connections = [self._writer, *self._readers] if self._writer else []
+        self._writer, self._readers, self._idle = None, [], None
+        for db in connections:
+            with contextlib.suppress(Exception):
+                await db.close()
+
+    @contextlib.asynccontextmanager
+    async def reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        if self._idle is None:
+            async with _connect() as db:
+                yield db
+            return
+        idle = self._idle
+        db = await idle.get()
+        db.row_factory = None
+        try:
+            yield db
+        finally:
+            idle.put_nowait(db)
+
+    @contextlib.asynccontextmanager
+    async def writer(self) -> AsyncIterator[aiosqlite.Connection]:
+        if self._writer is None:
+            async with _connect() as db:
+                yield db
+            return
+        async with self._write_lock:
+            db = self._writer
+            db.row_factory = None
+            try:
+                yield db
+            finally:
+                # Never leave a half-done transaction for the next caller.
+                if db.in_transaction:
+                    await db.rollback()
+
+
+db_pool = ConnectionPool(Var.DB_READERS)
+
+
+class ViewCounter:
+    """Write-behind buffer for link view counts.
+
+    Views are added up in memory and written in one ``executemany``
+    transaction every ``interval`` seconds, or sooner once ``threshold``
+    views are pending. A viewer (client address and user agent) counts once
+    per link until it has been quiet for ``session_ttl`` seconds, so the
+    range requests of a single playback don't each count as a view.
+    """
+
+    MAX_SESSIONS = 100_000
+
+    def __init__(self, interval: float, threshold: int, session_ttl: float):
+        self.interval = interval
+        self.threshold = threshold
+        self.session_ttl = session_ttl
+        self.pending: Dict[int, int] = {}
+        self.pending_total = 0
+        self.sessions: "OrderedDict[Tuple[int, str], float]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+
+    def add(self, link_id: int, viewer: Optional[str] = None) -> None:
+        if viewer is not None and not self._new_session(link_id, viewer):
+            return
+        self.pending[link_id] = self.pending.get(link_id, 0) + 1
+        self.pending_total += 1
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        if self.pending_total >= self.threshold:
+            self._wakeup.set()
+
+    def _new_session(self, link_id: int, viewer: str) -> bool:
+        now = time.monotonic()
+        while self.sessions:
+            oldest_key, last_seen = next(iter(self.sessions.items()))
+            if now - last_seen < self.session_ttl and len(self.sessions) < self.MAX_SESSIONS:
+                break
+            del self.sessions[oldest_key]
+        key = (link_id, viewer)
+        is_new = key not in self.sessions
+        self.sessions[key] = now
+        self.sessions.move_to_end(key)
+        return is_new
+
+    async def _run(self) -> None:
+        while True:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        if not self.pending:
+            return
+        batch, self.pending, self.pending_total = self.pending, {}, 0
+        try:
+            async with db_pool.writer() as db:
+                await db.executemany(
+                    "UPDATE links SET views = views + ? WHERE id = ?",
+                    [(count, link_id) for link_id, count in batch.items()],
+                )
+                await db.commit()
+        except asyncio.CancelledError:
+            self._restore(batch)
+            raise
+        except Exception as e:
+            logging.warning(f"Could not write {sum(batch.values())} link views, keeping them for later: {e}")
+            self._restore(batch)
+
+    def _restore(self, batch: Dict[int, int]) -> None:
+        for link_id, count in batch.items():
+            self.pending[link_id] = self.pending.get(link_id, 0) + count
+            self.pending_total += count
+
+    async def close(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        await self.flush()
+
+
+view_counter = ViewCounter(Var.VIEWS_FLUSH_INTERVAL, Var.VIEWS_FLUSH_THRESHOLD, Var.VIEW_SESSION_TTL)
+
+
+async def close_db():
+    await view_counter.close()
+    await db_pool.close()
+
+
+# Schema changes after the base tables, applied in order and tracked with
+# PRAGMA user_version. Append new steps; never edit a released one.
+MIGRATIONS = [
+    # 1: indexes for the per-user link lists, the admin link search ordered by
+    # creation date, the upload/join stats ranges and the users list.
+    [
+        "CREATE INDEX IF NOT EXISTS idx_links_user_active ON links (user_id, is_active)",
+        "CREATE INDEX IF NOT EXISTS idx_links_active_created ON links (is_active, creation_date)",
+        "CREATE INDEX IF NOT EXISTS idx_links_created ON links (creation_date)",
+        "CREATE INDEX IF NOT EXISTS idx_users_join_date ON users (join_date)",
+    ],
+    # 2: full-text index over links.file_name, kept in sync by triggers.
+    [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS links_fts USING fts5("
+        "file_name, content='links', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        "CREATE TRIGGER IF NOT EXISTS links_fts_insert AFTER INSERT ON links BEGIN "
+        "INSERT INTO links_fts (rowid, file_name) VALUES (new.id, new.file_name); END",
+        "CREATE TRIGGER IF NOT EXISTS links_fts_delete AFTER DELETE ON links BEGIN "
+        "INSERT INTO links_fts (links_fts, rowid, file_name) VALUES ('delete', old.id, old.file_name); END",
+        "CREATE TRIGGER IF NOT EXISTS links_fts_update AFTER UPDATE OF file_name ON links BEGIN "
+        "INSERT INTO links_fts (links_fts, rowid, file_name) VALUES ('delete', old.id, old.file_name); "
+        "INSERT INTO links_fts (rowid, file_name) VALUES (new.id, new.file_name); END",
+        "INSERT INTO links_fts (links_fts) VALUES ('rebuild')",
+    ],
+    # 3: let /mylinks page through a user's links by (creation_date, id).
+    # It replaces (user_id, is_active) for lookups and counts; per-user lists
+    # must order by (creation_date, id) to avoid a temp B-tree sort.
+    [
+        "CREATE INDEX IF NOT EXISTS idx_links_user_active_created ON links (user_id, is_active, creation_date)",
+        "DROP INDEX IF EXISTS idx_links_user_active",
+    ],
+    # 4: key stored media auth keys by test_mode too, so test-DC and
+    # production keys can't collide. Old rows can't be attributed and are
+    # dropped; they only cost one fresh key exchange per DC.
+    [
+        "DROP TABLE IF EXISTS media_auth_keys",
+        "CREATE TABLE media_auth_keys ("
+        "user_id INTEGER, dc_id INTEGER, test_mode BOOLEAN, auth_key BLOB NOT NULL, created_at TIMESTAMP, "
+        "PRIMARY KEY (user_id, dc_id, test_mode))",
+    ],
+]
+
+
+def _fts_query(text: Optional[str]) -> Optional[str]:
+    """Turn a search box string into an FTS5 query matching every word as a prefix.
+
+    Returns None when the text has no searchable words, e.g. only punctuation.
+    """
+    words = re.findall(r"[^\W_]+", text or "")
+    return " ".join(f'"{word}"*' for word in words) or None
+
+
+def _file_name_filter(column: str, id_column: str, text: str):
+    """SQL condition and parameter for a file name search on ``column``.
+
+    ``id_column`` is the links rowid as aliased in the query, matched
+    against the FTS index.
+    """
+    match = _fts_query(text)
+    if match:
+        return f" AND {id_column} IN (SELECT rowid FROM links_fts WHERE links_fts MATCH ?)", match
+    return f" AND {column} LIKE ?", f"%{text}%"
+
+
+async def _migrate(db: aiosqlite.Connection):
+    version = (await (await db.execute("PRAGMA user_version")).fetchone())[0]
+    for number, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+        for statement in statements:
+            await db.execute(statement)
+        # PRAGMA doesn't take parameters; the value is our own integer.
+        await db.execute(f"PRAGMA user_version = {number}")
+        logging.info(f"Applied database migration {number}.")
+    if len(MIGRATIONS) > version:
+        await db.execute("ANALYZE")
+
+
+async def _keyset_page(
+    db: aiosqlite.Connection,
+    sql: str,
+    params: list,
+    table: str,
+    date_column: str,
+    id_column: str,
+    limit: int,
+    after: Optional[int] = None,
+    before: Optional[int] = None,
+) -> dict:
+    """Fetch one page of ``sql`` ordered by ``(date, id)``, newest first.
+
+    ``sql`` must end in a WHERE clause. ``after`` / ``before`` are row ids
+    taken from a previous page's ``next_cursor`` / ``prev_cursor``; the
+    query seeks straight to that row's ``(date, id)`` in the index, so deep
+    pages cost the same as the first one. Rows without a date sort last and
+    are read as a separate segment, since row-value comparisons skip NULLs.
+
+    Returns ``{"items": [...], "next_cursor": id | None, "prev_cursor": id | None}``.
+    """
+    backward = after is None and before is not None
+    cursor_id = before if backward else after
+    position = None
+    if cursor_id is not None:
+        # PARSE_DECLTYPES would turn the date into a datetime; compare the
+        # stored text instead.
+        row = await (await db.execute(f"SELECT CAST({date_column.split('.')[-1]} AS TEXT) FROM {table} WHERE id = ?", (cursor_id,))).fetchone()
+        if row is not None:
+            position = (row[0], cursor_id)
+
+    desc = f" ORDER BY {date_column} DESC, {id_column} DESC LIMIT ?"
+    asc = f" ORDER BY {date_column} ASC, {id_column} ASC LIMIT ?"
+    if position is None:
+        backward = False
+        segments = [("", [], desc)]
+    elif not backward and position[0] is not None:
+        segments = [
+            (f" AND ({date_column}, {id_column}) < (?, ?)", list(position), desc),
+            (f" AND {date_column} IS NULL", [], desc),
+        ]
+    elif not backward:
+        segments = [(f" AND {date_column} IS NULL AND {id_column} < ?", [cursor_id], desc)]
+    elif position[0] is not None:
+        segments = [(f" AND ({date_column}, {id_column}) > (?, ?)", list(position), asc)]
+    else:
+        segments = [
+            (f" AND {date_column} IS NULL AND {id_column} > ?", [cursor_id], asc),
+            (f" AND {date_column} IS NOT NULL", [], asc),
+        ]
+
+    rows = []
+    for condition, condition_params, order in segments:
+        cursor = await db.execute(sql + condition + order, [*params, *condition_params, limit + 1 - len(rows)])
+        rows.extend(dict(row) for row in await cursor.fetchall())
+        if len(rows) > limit:
+            break
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if backward:
+        rows.reverse()
+        more_after, more_before = True, has_more
+    else:
+        more_after, more_before = has_more, position is not None
+    return {
+        "items": rows,
+        "next_cursor": rows[-1]["id"] if rows and more_after else None,
+        "prev_cursor": rows[0]["id"] if rows and more_before else None,
+    }
+
+
 async def init_db():
     async with aiosqlite.connect(DB_PATH, detect_types=DETECT_TYPES) as db:
         await db.execute("PRAGMA journal_mode=WAL")
@@ -34,17 +362,6 @@ async def init_db():
             )
         ''')
 
-        cursor = await db.execute("PRAGMA table_info(links)")
-        columns = {row[1] for row in await cursor.fetchall()}
-        if 'views' not in columns:
-            await db.execute("ALTER TABLE links ADD COLUMN views INTEGER DEFAULT 0")
-        if 'creation_date' not in columns:
-            await db.execute("ALTER TABLE links ADD COLUMN creation_date TIMESTAMP")
-        if 'password' not in columns:
-            await db.execute("ALTER TABLE links ADD COLUMN password TEXT")
-        if 'expiry_date' not in columns:
-            await db.execute("ALTER TABLE links ADD COLUMN expiry_date TIMESTAMP")
-            
         await db.execute('''
             CREATE TABLE IF NOT EXISTS links (
                 id INTEGER PRIMARY KEY,
@@ -56,10 +373,30 @@ async def init_db():
                 creation_date TIMESTAMP,
                 password TEXT,
                 expiry_date TIMESTAMP,
+                file_id TEXT,
+                file_size INTEGER,
+                mime_type TEXT,
                 FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
             )
         ''')
 
+        cursor = await db.execute("PRAGMA table_info(links)")
+        columns = {row[1] for row in await cursor.fetchall()}
+        if 'views' not in columns:
+            await db.execute("ALTER TABLE links ADD COLUMN views INTEGER DEFAULT 0")
+        if 'creation_date' not in columns:
+            await db.execute("ALTER TABLE links ADD COLUMN creation_date TIMESTAMP")
+        if 'password' not in columns:
+            await db.execute("ALTER TABLE links ADD COLUMN password TEXT")
+        if 'expiry_date' not in columns:
+            await db.execute("ALTER TABLE links ADD COLUMN expiry_date TIMESTAMP")
+        if 'file_id' not in columns:
+            await db.execute("ALTER TABLE links ADD COLUMN file_id TEXT")
+        if 'file_size' not in columns:
+            await db.execute("ALTER TABLE links ADD COLUMN file_size INTEGER")
+        if 'mime_type' not in columns:
+            await db.execute("ALTER TABLE links ADD COLUMN mime_type TEXT")
+
         await db.execute('CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT)')
         await db.execute('''
             CREATE TABLE IF NOT EXISTS login_attempts (
@@ -68,12 +405,18 @@ async def init_db():
                 username_attempt TEXT, successful BOOLEAN
             )
         ''')
+        await _migrate(db)
+        if not Var.USE_SESSION_FILE:
+            # Session persistence is off; don't keep credentials from runs
+            # that had it on.
+            await db.execute("DELETE FROM media_auth_keys")
         await db.commit()
     logging.info("Database initialized/updated successfully.")
+    await db_pool.open()
     await add_owner_as_user()
 
 async def add_owner_as_user():
-    async with aiosqlite.connect(DB_PATH, detect_types=DETECT_TYPES) as db:
+    async with db_pool.writer() as db:
         if (await (await db.execute("SELECT 1 FROM users WHERE id = ?", (Var.OWNER_ID,))).fetchone()) is None:
             await db.execute(
                 "INSERT INTO users (id, join_date, traffic_limit_gb) VALUES (?, ?, ?)",
@@ -82,7 +425,7 @@ async def add_owner_as_user():
             await db.commit()
 
 async def add_or_update_user(user_id: int, first_name: str, last_name: str, username: str):
-    async with aiosqlite.connect(DB_PATH, detect_types=DETECT_TYPES) as db:
+    async with db_pool.writer() as db:
         await db.execute("UPDATE users SET first_name=?, last_name=?, username=? WHERE id=?", (first_name, last_name, username, user_id))
         await db.commit()
 
@@ -94,11 +437,14 @@ async def insert_link(
     file_unique_id: str,
     password: str = None,
     expiry_date: datetime = None,
+    file_id: str = None,
+    file_size: int = None,
+    mime_type: str = None,
 ):
-    async with aiosqlite.connect(DB_PATH, detect_types=DETECT_TYPES) as db:
+    async with db_pool.writer() as db:
         expiry_date_utc = _ensure_utc(expiry_date)
         await db.execute(
-            "INSERT INTO links (id, user_id, file_name, file_size_mb, file_unique_id, creation_date, password, expiry_date) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            "INSERT INTO links (id, user_id, file_name, file_size_mb, file_unique_id, creation_date, password, expiry_date, file_id, file_size, mime_type) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
             (
                 link_id,
                 user_id,
@@ -108,13 +454,76 @@ async def insert_link(
                 datetime.datetime.now(datetime.timezone.utc),
                 password,
                 expiry_date_utc,
+                file_id,
+                file_size,
+                mime_type,
             ),
         )
         await db.commit()
+
+async def get_link_file_properties(link_id: int) -> Optional[dict]:
+    """Returns the stored FileId string and media metadata of a link, if any."""
+    async with db_pool.reader() as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(
+            "SELECT file_id, file_size, mime_type, file_name, file_unique_id FROM links WHERE id = ? AND file_id IS NOT NULL",
+            (link_id,)
+        )
+        row = await cursor.fetchone()
+        return dict(row) if row else None
+
+async def update_link_file_properties(link_id: int, file_id: str, file_size: int, mime_type: str):
+    async with db_pool.writer() as db:
+        await db.execute(
+            "UPDATE links SET file_id = ?, file_size = ?, mime_type = ? WHERE id = ?",
+            (file_id, file_size, mime_type, link_id)
+        )
+        await db.commit()
+
+async def get_recent_file_ids(limit: int = 1000) -> list:
+    """Returns stored FileId strings of the most recent active links."""
+    async with db_pool.reader() as db:
+        cursor = await db.execute(
+            "SELECT file_id FROM links WHERE file_id IS NOT NULL AND is_active = 1 ORDER BY id DESC LIMIT ?",
+            (limit,)
+        )
+        return [row[0] for row in await cursor.fetchall()]
+
+async def get_media_auth_key(user_id: int, dc_id: int, test_mode: bool) -> Optional[bytes]:
+    """Returns the auth key a client previously authorized on a foreign DC.
+
+    Keys are only kept when USE_SESSION_FILE is on, like the session files.
+    """
+    if not Var.USE_SESSION_FILE:
+        return None
+    async with db_pool.reader() as db:
+        row = await (await db.execute(
+            "SELECT auth_key FROM media_auth_keys WHERE user_id = ? AND dc_id = ? AND test_mode = ?",
+            (user_id, dc_id, test_mode)
+        )).fetchone()
+        return bytes(row[0]) if row else None
+
+async def save_media_auth_key(user_id: int, dc_id: int, test_mode: bool, auth_key: bytes):
+    if not Var.USE_SESSION_FILE:
+        return
+    async with db_pool.writer() as db:
+        await db.execute(
+            "INSERT OR REPLACE INTO media_auth_keys (user_id, dc_id, test_mode, auth_key, created_at) VALUES (?, ?, ?, ?, ?)",
+            (user_id, dc_id, test_mode, auth_key, datetime.datetime.now(datetime.timezone.utc))
+        )
+        await db.commit()
+
+async def delete_media_auth_key(user_id: int, dc_id: int, test_mode: bool):
+    async with db_pool.writer() as db:
+        await db.execute(
+            "DELETE FROM media_auth_keys WHERE user_id = ? AND dc_id = ? AND test_mode = ?",
+            (user_id, dc_id, test_mode)
+        )
+        await db.commit()
 
 async def get_link_with_owner_info(link_id: int) -> dict:
     """Returns link details along with owner's ban status."""
-    async with aiosqlite.connect(DB_PATH, detect_types=DETECT_TYPES) as db:
+    async with db_pool.reader() as db:
         db.row_factory = aiosqlite.Row
         cursor = await db.execute(
             """
@@ -128,100 +537,101 @@ async def get_link_with_owner_info(link_id: int) -> dict:
         return dict(row) if row else None
 
 async def set_user_lang(user_id: int, lang_code: str):
-    async with aiosqlite.connect(DB_PATH, detect_types=DETECT_TYPES) as db:
+    async with db_pool.writer() as db:
         async with lock:
             await db.execute("UPDATE users SET language = ? WHERE id = ?", (lang_code, user_id))
             await db.commit()
             user_lang_cache[user_id] = lang_code
 async def is_user_authorized(user_id: int) -> bool:
-    async with aiosqlite.connect(DB_PATH, detect_types=DETECT_TYPES) as db:
+    async with db_pool.reader() as db:
         return (await (await db.execute("SELECT 1 FROM users WHERE id = ?", (user_id,))).fetchone()) is not None
 async def get_user_traffic_details(user_id: int) -> dict:
-    async with aiosqlite.connect(DB_PATH, detect_types=DETECT_TYPES) as db:
+    async with db_pool.reader() as db:
         db.row_factory = aiosqlite.Row
         return dict(await (await db.execute("SELECT total_size, traffic_limit_gb FROM users WHERE id = ?", (user_id,))).fetchone() or {})
 async def is_user_banned(user_id: int) -> bool:
-    async with aiosqlite.connect(DB_PATH, detect_types=DETECT_TYPES) as db:
+    async with db_pool.reader() as db:
         return (res := await (await db.execute("SELECT is_banned FROM users WHERE id = ?", (user_id,))).fetchone()) and res[0] == 1
 async def ban_user(user_id: int):
-    async with aiosqlite.connect(DB_PATH) as db: await db.execute("UPDATE users SET is_banned = 1 WHERE id = ?", (user_id,)); await db.commit()
+    async with db_pool.writer() as db: await db.execute("UPDATE users SET is_banned = 1 WHERE id = ?", (user_id,)); await db.commit()
 async def unban_user(user_id: int):
-    async with aiosqlite.connect(DB_PATH) as db: await db.execute("UPDATE users SET is_banned = 0 WHERE id = ?", (user_id,)); await db.commit()
+    async with db_pool.writer() as db: await db.execute("UPDATE users SET is_banned = 0 WHERE id = ?", (user_id,)); await db.commit()
 async def is_link_active(link_id: int) -> bool:
-    async with aiosqlite.connect(DB_PATH, detect_types=DETECT_TYPES) as db:
+    async with db_pool.reader() as db:
         return (res := await (await db.execute("SELECT is_active FROM links WHERE id = ?", (link_id,))).fetchone()) and res[0] == 1
 async def count_user_links(user_id: int, query: str = None) -> int:
-    async with aiosqlite.connect(DB_PATH, detect_types=DETECT_TYPES) as db:
+    async with db_pool.reader() as db:
         sql = "SELECT COUNT(id) FROM links WHERE user_id = ? AND is_active = 1"
         params = [user_id]
         if query:
-            sql += " AND file_name LIKE ?"
-            params.append(f"%{query}%")
+            condition, param = _file_name_filter("file_name", "id", query)
+            sql += condition
+            params.append(param)
         return (await (await db.execute(sql, params)).fetchone())[0] or 0
 async def delete_link(link_id: int, user_id: int):
-    async with aiosqlite.connect(DB_PATH) as db: await db.execute("UPDATE links SET is_active = 0 WHERE id = ? AND user_id = ?", (link_id, user_id)); await db.commit()
+    async with db_pool.writer() as db: await db.execute("UPDATE links SET is_active = 0 WHERE id = ? AND user_id = ?", (link_id, user_id)); await db.commit()
 async def get_stats(user_id: int) -> tuple:
-    async with aiosqlite.connect(DB_PATH, detect_types=DETECT_TYPES) as db:
+    async with db_pool.reader() as db:
         return await (await db.execute("SELECT total_files, total_size FROM users WHERE id = ?", (user_id,))).fetchone() or (0, 0.0)
 async def add_user_by_admin(user_id: int, limit_gb: float = None):
-    async with aiosqlite.connect(DB_PATH, detect_types=DETECT_TYPES) as db:
+    async with db_pool.writer() as db:
         await db.execute("INSERT INTO users (id, join_date, traffic_limit_gb) VALUES (?, ?, ?) ON CONFLICT(id) DO UPDATE SET traffic_limit_gb=excluded.traffic_limit_gb", (user_id, datetime.datetime.now(), limit_gb)); await db.commit()
 async def update_user_limit(user_id: int, limit_gb: float = None):
-    async with aiosqlite.connect(DB_PATH, detect_types=DETECT_TYPES) as db: await db.execute("UPDATE users SET traffic_limit_gb = ? WHERE id = ?", (limit_gb, user_id)); await db.commit()
+    async with db_pool.writer() as db: await db.execute("UPDATE users SET traffic_limit_gb = ? WHERE id = ?", (limit_gb, user_id)); await db.commit()
 async def get_all_user_ids():
-    async with aiosqlite.connect(DB_PATH, detect_types=DETECT_TYPES) as db:
+    async with db_pool.reader() as db:
         return [row[0] for row in await (await db.execute("SELECT id FROM users WHERE is_banned = 0")).fetchall()]
 async def get_daily_join_stats():
-    async with aiosqlite.connect(DB_PATH, detect_types=DETECT_TYPES) as db:
+    async with db_pool.reader() as db:
         db.row_factory = aiosqlite.Row
         return [dict(row) for row in await (await db.execute("SELECT DATE(join_date) as date, COUNT(id) as count FROM users WHERE join_date >= DATE('now', '-7 days') GROUP BY DATE(join_date) ORDER BY date ASC")).fetchall()]
 
 async def update_stats(user_id: int, file_size_mb: float):
-    async with aiosqlite.connect(DB_PATH, detect_types=DETECT_TYPES) as db: await db.execute("UPDATE users SET total_files = total_files + 1, total_size = total_size + ? WHERE id = ?", (file_size_mb, user_id)); await db.commit()
-async def get_user_links(user_id: int, offset: int, limit: int, query: str = None) -> list:
-    async with aiosqlite.connect(DB_PATH, detect_types=DETECT_TYPES) as db:
+    async with db_pool.writer() as db: await db.execute("UPDATE users SET total_files = total_files + 1, total_size = total_size + ? WHERE id = ?", (file_size_mb, user_id)); await db.commit()
+async def get_user_links(user_id: int, limit: int, query: str = None, after: int = None, before: int = None) -> dict:
+    """Returns one page of a user's active links, newest first (see ``_keyset_page``)."""
+    async with db_pool.reader() as db:
         db.row_factory = aiosqlite.Row
         sql = "SELECT id, file_name, file_size_mb, views FROM links WHERE user_id = ? AND is_active = 1"
         params = [user_id]
         if query:
-            sql += " AND file_name LIKE ?"
-            params.append(f"%{query}%")
-        sql += " ORDER BY id DESC LIMIT ? OFFSET ?"
-        params.extend([limit, offset])
-        cursor = await db.execute(sql, params)
-        return [dict(row) for row in await cursor.fetchall()]
-async def increment_link_views(link_id: int):
-    async with aiosqlite.connect(DB_PATH) as db: await db.execute("UPDATE links SET views = views + 1 WHERE id = ?", (link_id,)); await db.commit()
+            condition, param = _file_name_filter("file_name", "id", query)
+            sql += condition
+            params.append(param)
+        return await _keyset_page(db, sql, params, "links", "creation_date", "id", limit, after, before)
+async def increment_link_views(link_id: int, viewer: Optional[str] = None):
+    """Counts a view; repeated requests from the same viewer session count once."""
+    view_counter.add(link_id, viewer)
 
 async def get_db_settings() -> dict:
-    async with aiosqlite.connect(DB_PATH, detect_types=DETECT_TYPES) as db:
+    async with db_pool.reader() as db:
         db.row_factory = aiosqlite.Row
         return {row['key']: row['value'] for row in await (await db.execute("SELECT key, value FROM settings")).fetchall()}
 async def update_db_setting(key: str, value: str):
-    async with aiosqlite.connect(DB_PATH) as db: await db.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, value)); await db.commit()
+    async with db_pool.writer() as db: await db.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, value)); await db.commit()
 async def log_login_attempt(ip: str, username: str, success: bool):
-    async with aiosqlite.connect(DB_PATH, detect_types=DETECT_TYPES) as db:
+    async with db_pool.writer() as db:
         await db.execute("INSERT INTO login_attempts (timestamp, ip_address, username_attempt, successful) VALUES (?, ?, ?, ?)", (datetime.datetime.now(), ip, username, success)); await db.commit()
 async def get_login_attempts(limit: int = 100):
-    async with aiosqlite.connect(DB_PATH, detect_types=DETECT_TYPES) as db:
+    async with db_pool.reader() as db:
         db.row_factory = aiosqlite.Row
         return [dict(row) for row in await (await db.execute("SELECT * FROM login_attempts ORDER BY timestamp DESC LIMIT ?", (limit,))).fetchall()]
 async def get_db_stats_for_panel():
-    async with aiosqlite.connect(DB_PATH, detect_types=DETECT_TYPES) as db:
+    async with db_pool.reader() as db:
         total_users = (await (await db.execute("SELECT COUNT(id) FROM users")).fetchone())[0] or 0
         total_links = (await (await db.execute("SELECT COUNT(id) FROM links WHERE is_active = 1")).fetchone())[0] or 0
         total_traffic_mb = (await (await db.execute("SELECT SUM(total_size) FROM users")).fetchone())[0] or 0
         return {"total_users": total_users, "total_links": total_links, "total_traffic_gb": total_traffic_mb / 1024 if total_traffic_mb else 0}
 async def get_daily_uploads_stats(days: int = 7):
-    async with aiosqlite.connect(DB_PATH, detect_types=DETECT_TYPES) as db:
+    async with db_pool.reader() as db:
         db.row_factory = aiosqlite.Row
         return [dict(r) for r in await (await db.execute(f"SELECT DATE(creation_date) as date, COUNT(id) as count FROM links WHERE creation_date >= DATE('now', '-{days} days') GROUP BY date ORDER BY date ASC")).fetchall()]
 async def get_top_traffic_users(limit: int = 5):
-    async with aiosqlite.connect(DB_PATH, detect_types=DETECT_TYPES) as db:
+    async with db_pool.reader() as db:
         db.row_factory = aiosqlite.Row
         return [dict(r) for r in await (await db.execute("SELECT first_name, username, id, total_size FROM users WHERE total_size > 0 ORDER BY total_size DESC LIMIT ?", (limit,))).fetchall()]
 async def get_file_type_stats():
-    async with aiosqlite.connect(DB_PATH, detect_types=DETECT_TYPES) as db:
+    async with db_pool.reader() as db:
         db.row_factory = aiosqlite.Row
         query = """
             SELECT CASE
@@ -233,40 +643,48 @@ async def get_file_type_stats():
             FROM links WHERE is_active = 1 GROUP BY file_type
         """
         return [dict(r) for r in await (await db.execute(query)).fetchall()]
-async def search_all_links(file_q="", user_q="", status="active"):
-    async with aiosqlite.connect(DB_PATH, detect_types=DETECT_TYPES) as db:
+def _link_search_filter(file_q: str, user_q: str, status: str):
+    """FROM/WHERE clause and parameters shared by the admin link search and its count."""
+    sql = " FROM links l JOIN users u ON l.user_id = u.id WHERE l.is_active = ? "
+    params = [1 if status == "active" else 0]
+    if file_q: condition, param = _file_name_filter("l.file_name", "l.id", file_q); sql += condition; params.append(param)
+    if user_q: sql += " AND (u.first_name LIKE ? OR u.username LIKE ? OR u.id LIKE ?)"; params.extend([f"%{user_q}%"]*3)
+    return sql, params
+async def search_all_links(file_q="", user_q="", status="active", limit: int = 50, after: int = None, before: int = None) -> dict:
+    async with db_pool.reader() as db:
         db.row_factory = aiosqlite.Row
-        sql = "SELECT l.*, u.id as user_id, u.first_name, u.username FROM links l JOIN users u ON l.user_id = u.id WHERE l.is_active = ? "
-        params = [1 if status == "active" else 0]
-        if file_q: sql += " AND l.file_name LIKE ?"; params.append(f"%{file_q}%")
-        if user_q: sql += " AND (u.first_name LIKE ? OR u.username LIKE ? OR u.id LIKE ?)"; params.extend([f"%{user_q}%"]*3)
-        sql += " ORDER BY l.creation_date DESC"
-        return [dict(row) for row in await (await db.execute(sql, params)).fetchall()]
+        sql, params = _link_search_filter(file_q, user_q, status)
+        sql = "SELECT l.*, u.id as user_id, u.first_name, u.username" + sql
+        return await _keyset_page(db, sql, params, "links", "l.creation_date", "l.id", limit, after, before)
+async def count_all_links(file_q="", user_q="", status="active") -> int:
+    """Total number of links matching an admin search, across all pages."""
+    async with db_pool.reader() as db:
+        sql, params = _link_search_filter(file_q, user_q, status)
+        return (await (await db.execute("SELECT COUNT(l.id)" + sql, params)).fetchone())[0]
 async def deactivate_links_by_ids(link_ids: list):
-    async with aiosqlite.connect(DB_PATH) as db: await db.executemany("UPDATE links SET is_active = 0 WHERE id = ?", [(id,) for id in link_ids]); await db.commit()
+    async with db_pool.writer() as db: await db.executemany("UPDATE links SET is_active = 0 WHERE id = ?", [(id,) for id in link_ids]); await db.commit()
 async def deactivate_user_links(user_id: int):
-    async with aiosqlite.connect(DB_PATH) as db: await db.execute("UPDATE links SET is_active = 0 WHERE user_id = ?", (user_id,)); await db.commit()
+    async with db_pool.writer() as db: await db.execute("UPDATE links SET is_active = 0 WHERE user_id = ?", (user_id,)); await db.commit()
 
-async def get_all_users_for_panel(search_query: str = None):
-    async with aiosqlite.connect(DB_PATH, detect_types=DETECT_TYPES) as db:
+async def get_all_users_for_panel(search_query: str = None, limit: int = 50, after: int = None, before: int = None) -> dict:
+    async with db_pool.reader() as db:
         db.row_factory = aiosqlite.Row
-        sql, params = "SELECT * FROM users", []
-        if search_query: sql += " WHERE first_name LIKE ? OR username LIKE ? OR id LIKE ?"; params.extend([f"%{search_query}%"]*3)
-        sql += " ORDER BY join_date DESC"
-        return [dict(row) for row in await (await db.execute(sql, params)).fetchall()]
+        sql, params = "SELECT * FROM users WHERE 1", []
+        if search_query: sql += " AND (first_name LIKE ? OR username LIKE ? OR id LIKE ?)"; params.extend([f"%{search_query}%"]*3)
+        return await _keyset_page(db, sql, params, "users", "join_date", "id", limit, after, before)
 async def get_user_details_for_panel(user_id: int):
-    async with aiosqlite.connect(DB_PATH, detect_types=DETECT_TYPES) as db:
+    async with db_pool.reader() as db:
         db.row_factory = aiosqlite.Row
         user_data = await (await db.execute("SELECT * FROM users WHERE id = ?", (user_id,))).fetchone()
         return dict(user_data) if user_data else None
 async def get_all_links_for_user(user_id: int):
-    async with aiosqlite.connect(DB_PATH, detect_types=DETECT_TYPES) as db:
+    async with db_pool.reader() as db:
         db.row_factory = aiosqlite.Row
-        return [dict(r) for r in await (await db.execute("SELECT * FROM links WHERE user_id = ? AND is_active = 1 ORDER BY id DESC", (user_id,))).fetchall()]
+        return [dict(r) for r in await (await db.execute("SELECT * FROM links WHERE user_id = ? AND is_active = 1 ORDER BY creation_date DESC, id DESC", (user_id,))).fetchall()]
 async def admin_delete_link(link_id: int):
-    async with aiosqlite.connect(DB_PATH) as db: await db.execute("UPDATE links SET is_active = 0 WHERE id = ?", (link_id,)); await db.commit()
+    async with db_pool.writer() as db: await db.execute("UPDATE links SET is_active = 0 WHERE id = ?", (link_id,)); await db.commit()
 async def get_link_by_id(link_id: int):
-    async with aiosqlite.connect(DB_PATH, detect_types=DETECT_TYPES) as db:
+    async with db_pool.reader() as db:
         db.row_factory = aiosqlite.Row
         cursor = await db.execute(
             "SELECT id, file_name, file_unique_id FROM links WHERE id = ? AND is_active = 1",
@@ -276,7 +694,7 @@ async def get_link_by_id(link_id: int):
         return dict(row) if row else None
 async def update_link_details(link_id: int, user_id: int, password: str = None, expiry_date: datetime = None):
     """Updates the password and/or expiry date for a given link, owned by the user."""
-    async with aiosqlite.connect(DB_PATH, detect_types=DETECT_TYPES) as db:
+    async with db_pool.writer() as db:
         cursor = await db.execute("SELECT 1 FROM links WHERE id = ? AND user_id = ?", (link_id, user_id))
         if await cursor.fetchone() is None:
             return False 
@@ -7,25 +7,37 @@ from WebStreamer.bot.i18n import get_i18n_texts
 from WebStreamer.utils.file_properties import get_hash
 from WebStreamer.vars import Var
 from urllib.parse import quote_plus
-import math
 
 LINKS_PER_PAGE = 5
+# Pages are addressed by keyset cursors: "f" is the first page, "a<id>" the
+# page after link <id> and "b<id>" the page before it.
+FIRST_PAGE = "f"
 
-async def get_links_keyboard(user_id, page, total_links):
+def _parse_page(page: str):
+    if page[:1] in ("a", "b") and page[1:].isdigit():
+        return (int(page[1:]), None) if page[0] == "a" else (None, int(page[1:]))
+    return None, None
+
+async def get_links_keyboard(user_id, page=FIRST_PAGE):
     lang_texts = await get_i18n_texts(user_id)
-    links = await get_user_links(user_id, offset=page * LINKS_PER_PAGE, limit=LINKS_PER_PAGE)
-    
+    after, before = _parse_page(page)
+    result = await get_user_links(user_id, limit=LINKS_PER_PAGE, after=after, before=before)
+    if not result["items"] and page != FIRST_PAGE:
+        # The page emptied out (e.g. its last link was deleted); start over.
+        page = FIRST_PAGE
+        result = await get_user_links(user_id, limit=LINKS_PER_PAGE)
+
     keyboard = []
-    for link in links:
+    for link in result["items"]:
         views = link.get('views', 0)
         button_text = f"👁 {views} | {link['file_name']} ({link['file_size_mb']:.2f} MB)"
         keyboard.append([InlineKeyboardButton(button_text, callback_data=f"mylink_{link['id']}_{page}")])
 
     nav_buttons = []
-    if page > 0:
-        nav_buttons.append(InlineKeyboardButton(f"◀️ {lang_texts.get('PREVIOUS_BUTTON')}", callback_data=f"page_{page-1}"))
-    if (page + 1) * LINKS_PER_PAGE < total_links:
-        nav_buttons.append(InlineKeyboardButton(f"{lang_texts.get('NEXT_BUTTON')} ▶️", callback_data=f"page_{page+1}"))
+    if result["prev_cursor"]:
+        nav_buttons.append(InlineKeyboardButton(f"◀️ {lang_texts.get('PREVIOUS_BUTTON')}", callback_data=f"page_b{result['prev_cursor']}"))
+    if result["next_cursor"]:
+        nav_buttons.append(InlineKeyboardButton(f"{lang_texts.get('NEXT_BUTTON')} ▶️", callback_data=f"page_a{result['next_cursor']}"))
     
     if nav_buttons:
         keyboard.append(nav_buttons)
@@ -47,7 +59,7 @@ async def mylinks_handler(bot, m: Message):
         await m.reply_text(lang_texts.get("NO_LINKS_YET"), quote=True)
         return
 
-    keyboard = await get_links_keyboard(user_id, 0, total_links)
+    keyboard = await get_links_keyboard(user_id)
     await m.reply_text(lang_texts.get("MYLINKS_HEADER"), reply_markup=keyboard, quote=True)
 
 @StreamBot.on_callback_query(filters.regex(r"^(page|mylink|getlink|confirmdelete)_"))
@@ -62,9 +74,7 @@ async def links_callback_handler(bot, query: CallbackQuery):
         return
 
     if action == "page":
-        page = int(data[1])
-        total_links = await count_user_links(user_id)
-        keyboard = await get_links_keyboard(user_id, page, total_links)
+        keyboard = await get_links_keyboard(user_id, data[1])
         try:
             await query.message.edit_text(lang_texts.get("MYLINKS_HEADER"), reply_markup=keyboard)
         except errors.MessageNotModified:
@@ -72,7 +82,7 @@ async def links_callback_handler(bot, query: CallbackQuery):
 
     elif action == "mylink":
         link_id = int(data[1])
-        page = int(data[2])
+        page = data[2]
         link_info = await get_link_by_id(link_id)
         
         keyboard = InlineKeyboardMarkup([
@@ -103,16 +113,14 @@ async def links_callback_handler(bot, query: CallbackQuery):
         
     elif action == "confirmdelete":
         link_id = int(data[1])
-        page = int(data[2])
+        page = data[2]
         await delete_link(link_id, user_id)
         await query.answer(lang_texts.get("LINK_DELETED_SUCCESS"), show_alert=True)
         total_links = await count_user_links(user_id)
         if total_links == 0:
             await query.message.edit_text(lang_texts.get("ALL_LINKS_DELETED"))
             return
-        if page > 0 and page >= math.ceil(total_links / LINKS_PER_PAGE):
-            page -= 1
-        keyboard = await get_links_keyboard(user_id, page, total_links)
+        keyboard = await get_links_keyboard(user_id, page)
         await query.message.edit_text(lang_texts.get("MYLINKS_HEADER"), reply_markup=keyboard)
         
     await query.answer()
\ No newline at end of file
@@ -126,7 +126,13 @@ async def generate_single_link(m: Message):
     file_unique_id = await parse_file_unique_id(m)
     await add_or_update_user(user_id, m.from_user.first_name, m.from_user.last_name or '', m.from_user.username or '')
     await update_stats(user_id, file_size_in_mb)
-    await insert_link(user_id, log_msg.id, final_filename, file_size_in_mb, file_unique_id, password, expiry_date)
+    log_media = get_media_from_message(log_msg)
+    await insert_link(
+        user_id, log_msg.id, final_filename, file_size_in_mb, file_unique_id, password, expiry_date,
+        file_id=getattr(log_media, "file_id", None),
+        file_size=getattr(log_media, "file_size", None),
+        mime_type=getattr(log_media, "mime_type", None),
+    )
 
     logger.info(f"Link generated for user {user_id} (@{m.from_user.username}). File: '{final_filename}', Link ID: {log_msg.id}")
 
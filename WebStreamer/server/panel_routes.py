@@ -10,10 +10,12 @@ from aiohttp_session import get_session
 from pyrogram.errors import FloodWait, InputUserDeactivated, UserIsBlocked
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
+from WebStreamer import utils
+from WebStreamer.bot import work_loads
 from WebStreamer.bot.config import config
 from WebStreamer.bot.database import (
-    add_user_by_admin, admin_delete_link, ban_user, deactivate_links_by_ids,
-    deactivate_user_links, get_all_links_for_user, get_all_user_ids,
+    add_user_by_admin, admin_delete_link, ban_user, count_all_links,
+    deactivate_links_by_ids, deactivate_user_links, get_all_links_for_user, get_all_user_ids,
     get_all_users_for_panel, get_daily_join_stats, get_daily_uploads_stats,
     get_db_stats_for_panel, get_file_type_stats, get_login_attempts,
     get_user_details_for_panel, log_login_attempt, search_all_links,
@@ -27,6 +29,8 @@ from .security import generate_csrf_token, validate_csrf_token, verify_password
 routes = web.RouteTableDef()
 logger = logging.getLogger("panel_routes")
 
+PANEL_PAGE_SIZE = 50
+
 
 @web.middleware
 async def auth_middleware(request: web.Request, handler):
@@ -52,6 +56,22 @@ async def get_panel_context(request: web.Request):
         "current_path_for_lang_switcher": request.path,
     }
 
+def _page_cursors(request: web.Request):
+    """``after`` / ``before`` keyset cursors from the query string."""
+    after, before = request.rel_url.query.get("after", ""), request.rel_url.query.get("before", "")
+    return (int(after) if after.isdigit() else None), (int(before) if before.isdigit() else None)
+
+def _page_urls(request: web.Request, page: dict) -> dict:
+    """Links to the neighbouring pages, keeping the other query parameters.
+
+    One-shot notices such as ``deleted`` are not carried over.
+    """
+    query = {k: v for k, v in request.rel_url.query.items() if k not in ("after", "before", "deleted")}
+    return {
+        "next_page_url": str(request.rel_url.with_query({**query, "after": page["next_cursor"]})) if page["next_cursor"] else None,
+        "prev_page_url": str(request.rel_url.with_query({**query, "before": page["prev_cursor"]})) if page["prev_cursor"] else None,
+    }
+
 def parse_buttons(text: str):
     pattern = r'\[(.+?)\]\((https?://.+?)\)'
     matches = re.findall(pattern, text)
@@ -136,8 +156,11 @@ async def dashboard_route(request: web.Request):
 async def users_list_route(request: web.Request):
     context = await get_panel_context(request)
     search_query = request.rel_url.query.get('q', '')
-    context["users"] = await get_all_users_for_panel(search_query)
+    after, before = _page_cursors(request)
+    page = await get_all_users_for_panel(search_query, PANEL_PAGE_SIZE, after=after, before=before)
+    context["users"] = page["items"]
     context["search_query"] = search_query
+    context.update(_page_urls(request, page))
     return context
 
 @routes.get("/admin/users/add", name="admin_add_user")
@@ -274,8 +297,12 @@ async def settings_post_route(request: web.Request):
 @aiohttp_jinja2.template('search_links.html')
 async def search_links_route(request: web.Request):
     context = await get_panel_context(request)
+    after, before = _page_cursors(request)
+    search = (request.rel_url.query.get('file_q', ''), request.rel_url.query.get('user_q', ''), request.rel_url.query.get('status', 'active'))
+    page = await search_all_links(*search, limit=PANEL_PAGE_SIZE, after=after, before=before)
+    context.update(_page_urls(request, page))
     context.update({
-        "links": await search_all_links(request.rel_url.query.get('file_q', ''), request.rel_url.query.get('user_q', ''), request.rel_url.query.get('status', 'active')),
+        "links": page["items"], "total_links": await count_all_links(*search),
         "search_file_query": request.rel_url.query.get('file_q', ''), "search_user_query": request.rel_url.query.get('user_q', ''),
         "search_status": request.rel_url.query.get('status', 'active'), "deleted": request.rel_url.query.get('deleted')
     })
@@ -306,6 +333,18 @@ async def server_logs_route(request: web.Request):
         context['logs'] = f"Error reading log file: {e}"
     return context
 
+@routes.get("/admin/stats/streaming", name="admin_streaming_stats")
+async def streaming_stats_api(request: web.Request):
+    # Per-connection and cache figures; kept behind the panel login.
+    return web.json_response({
+        "loads": {f"bot{c + 1}": l for c, (_, l) in enumerate(sorted(work_loads.items()))},
+        "streaming": {**utils.stream_stats, **utils.streamers.stats()},
+        "chunk_cache": utils.chunk_cache.stats(),
+        "memory_cache": utils.memory_cache.stats(),
+        "load_balancer": utils.load_balancer.stats(),
+        "streams": utils.active_streams.stats(),
+    })
+
 @routes.get("/admin/security/login_logs", name="admin_login_logs")
 @aiohttp_jinja2.template('login_logs.html')
 async def login_logs_route(request: web.Request):
@@ -6,8 +6,9 @@ import math
 import logging
 import mimetypes
 import asyncio
+import secrets
 import datetime
-from typing import Tuple, Optional, Any
+from typing import List, Tuple, Optional, Any
 
 from aiohttp import web
 from urllib.parse import unquote_plus, quote
@@ -23,7 +24,6 @@ import aiohttp_jinja2
 
 logger = logging.getLogger("routes")
 routes = web.RouteTableDef()
-class_cache = {}
 
 
 def _prepare_disposition_filename(file_name: str) -> tuple[str, str]:
@@ -58,31 +58,15 @@ def _build_content_disposition_header(disposition_type: str, filenames: tuple[st
     return header_value
 
 
-def _parse_range_header(range_header: str, file_size: int) -> Tuple[int, int, bool]:
-    """Parse a RFC7233 range header.
-
-    Returns a tuple of ``(from_bytes, until_bytes, is_partial)``. ``is_partial`` is
-    ``True`` when the client explicitly requested a subset of the file.
-
-    Raises ``ValueError`` for malformed or unsatisfiable ranges.
-    """
-
-    if not range_header:
-        return 0, file_size - 1, False
+# Upper bound on range specs per request, so a header listing thousands of
+# tiny ranges can't turn into thousands of Telegram fetches.
+MAX_RANGES = 32
 
-    try:
-        unit, range_spec = range_header.strip().split("=", 1)
-    except ValueError as exc:  # pragma: no cover - defensive guard
-        raise ValueError("Invalid Range header format") from exc
-
-    if unit.lower() != "bytes":
-        raise ValueError("Only bytes Range unit is supported")
 
-    ranges = range_spec.split(",")
-    if len(ranges) != 1:
-        raise ValueError("Multiple ranges are not supported")
+def _parse_byte_range_spec(spec: str, file_size: int) -> Tuple[int, int]:
+    """Resolve one ``first-last`` / ``first-`` / ``-suffix`` spec to offsets."""
 
-    start_str, end_str = ranges[0].strip().split("-", 1)
+    start_str, end_str = spec.strip().split("-", 1)
 
     if start_str:
         start = int(start_str)
@@ -113,7 +97,142 @@ def _parse_range_header(range_header: str, file_size: int) -> Tuple[int, int, bo
     if start < 0 or end < start:
         raise ValueError("Invalid byte range")
 
-    return start, end, True
+    return start, end
+
+
+def _parse_range_header(range_header: str, file_size: int) -> Tuple[List[Tuple[int, int]], bool]:
+    """Parse a RFC7233 range header.
+
+    Returns a tuple of ``(ranges, is_partial)`` where ``ranges`` is a sorted
+    list of inclusive ``(start, end)`` offsets with overlapping and adjacent
+    ranges merged. ``is_partial`` is ``True`` when the client explicitly
+    requested a subset of the file.
+
+    Raises ``ValueError`` for malformed or unsatisfiable ranges.
+    """
+
+    if not range_header:
+        return [(0, file_size - 1)], False
+
+    try:
+        unit, range_spec = range_header.strip().split("=", 1)
+    except ValueError as exc:  # pragma: no cover - defensive guard
+        raise ValueError("Invalid Range header format") from exc
+
+    if unit.lower() != "bytes":
+        raise ValueError("Only bytes Range unit is supported")
+
+    specs = [spec for spec in range_spec.split(",") if spec.strip()]
+    if not specs:
+        raise ValueError("Empty range specifier")
+    if len(specs) > MAX_RANGES:
+        raise ValueError("Too many ranges")
+
+    # Unsatisfiable specs are skipped as long as one of them can be served.
+    ranges = []
+    for spec in specs:
+        try:
+            ranges.append(_parse_byte_range_spec(spec, file_size))
+        except ValueError:
+            if len(specs) == 1:
+                raise
+    if not ranges:
+        raise ValueError("No satisfiable range")
+
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+
+    return merged, True
+
+
+def _plan_fetch(from_bytes: int, until_bytes: int) -> Tuple[int, int, int, int, int]:
+    """Map a byte range to ``yield_file`` block arguments.
+
+    Returns ``(offset, first_part_cut, last_part_cut, part_count, chunk_size)``.
+    Small probes (moov lookups, seek checks) fetch small aligned blocks;
+    anything over 1 MiB uses the largest block Telegram allows.
+    """
+
+    chunk_size = utils.choose_chunk_size(until_bytes - from_bytes + 1)
+    offset = from_bytes - (from_bytes % chunk_size)
+    first_part_cut = from_bytes - offset
+    span = max(until_bytes - offset + 1, 0)
+    part_count = math.ceil(span / chunk_size) if span else 0
+    last_part_cut = (until_bytes % chunk_size) + 1 if part_count else 0
+    return offset, first_part_cut, last_part_cut, part_count, chunk_size
+
+
+def _group_ranges(ranges: List[Tuple[int, int]]) -> List[List[Tuple[int, int]]]:
+    """Batch ranges that are less than one block apart into a single fetch."""
+
+    groups = []
+    for start, end in ranges:
+        if groups and start - groups[-1][-1][1] <= utils.MAX_CHUNK_SIZE:
+            groups[-1].append((start, end))
+        else:
+            groups.append([(start, end)])
+    return groups
+
+
+def _multipart_part_header(boundary: str, mime_type: str, start: int, end: int, file_size: int) -> bytes:
+    return (
+        f"--{boundary}\r\n"
+        f"Content-Type: {mime_type}\r\n"
+        f"Content-Range: bytes {start}-{end}/{file_size}\r\n\r\n"
+    ).encode()
+
+
+def _multipart_length(ranges: List[Tuple[int, int]], boundary: str, mime_type: str, file_size: int) -> int:
+    length = len(f"--{boundary}--\r\n")
+    for start, end in ranges:
+        length += len(_multipart_part_header(boundary, mime_type, start, end, file_size))
+        length += end - start + 1 + 2
+    return length
+
+
+async def _multipart_body(tg_connect, file_id, index: int, ranges: List[Tuple[int, int]], boundary: str, mime_type: str):
+    """Stream a ``multipart/byteranges`` body.
+
+    Nearby ranges are fetched as one span through ``yield_file`` and cut into
+    their parts on the way out, so no Telegram block is requested twice.
+    """
+
+    file_size = file_id.file_size
+    for group in _group_ranges(ranges):
+        span_start, span_end = group[0][0], group[-1][1]
+        body = tg_connect.yield_file(file_id, index, *_plan_fetch(span_start, span_end))
+        position = span_start
+        current = 0
+        try:
+            async for chunk in body:
+                chunk = memoryview(chunk)
+                chunk_start = position
+                position += len(chunk)
+                while current < len(group):
+                    start, end = group[current]
+                    if start >= position:
+                        break
+                    if start >= chunk_start:
+                        yield _multipart_part_header(boundary, mime_type, start, end, file_size)
+                    lo = max(start, chunk_start) - chunk_start
+                    hi = min(end + 1, position) - chunk_start
+                    if hi > lo:
+                        yield chunk[lo:hi]
+                    if end >= position:
+                        break
+                    yield b"\r\n"
+                    current += 1
+        finally:
+            await body.aclose()
+        if current < len(group):
+            # The stream stopped early; bail out rather than pad a body
+            # that can no longer match Content-Length.
+            return
+    yield f"--{boundary}--\r\n".encode()
 
 
 def _etag_matches(header_value: str, current_etag: str) -> bool:
@@ -263,12 +382,17 @@ async def stream_handler(request: web.Request):
                     context["error"] = "Incorrect password"
                 return await aiohttp_jinja2.render_template_async('password.html', request, context)
 
-        asyncio.create_task(increment_link_views(message_id))
+        viewer = f"{request.headers.get('X-Forwarded-For') or request.remote}|{request.headers.get('User-Agent', '')}"
+        await increment_link_views(message_id, viewer)
 
         return await media_streamer(request, message_id, secure_hash, custom_filename, link_info)
 
     except (ConnectionError, ConnectionResetError, asyncio.CancelledError):
         logger.info("Client connection closed unexpectedly. This is normal for media streaming.")
+        prepared = request.get("stream_response")
+        if prepared is not None:
+            # Headers and part of the body are already on the wire.
+            return prepared
         return web.Response(status=200)
     except InvalidHash as e:
         raise web.HTTPForbidden(text=str(e))
@@ -281,6 +405,39 @@ async def stream_handler(request: web.Request):
         raise web.HTTPInternalServerError(text=str(e))
 
 
+async def _get_stripe_sources(index: int, message_id: int, file_id) -> list:
+    """Pick the least loaded extra clients to help download a large file.
+
+    Every helper resolves the message on its own, since file references and
+    access hashes are only valid for the client that fetched them.
+    """
+
+    helper_indexes = sorted(
+        (i for i in work_loads if i != index and not utils.load_balancer.stats_for(i).cooling_down),
+        key=work_loads.get,
+    )
+    helper_indexes = helper_indexes[:Var.STRIPE_CLIENTS - 1]
+    if not helper_indexes:
+        return []
+
+    streamers = [utils.streamers.get(multi_clients[helper_index]) for helper_index in helper_indexes]
+
+    results = await asyncio.gather(
+        *(streamer.get_file_properties(message_id) for streamer in streamers),
+        return_exceptions=True,
+    )
+
+    stripes = []
+    for helper_index, streamer, helper_file_id in zip(helper_indexes, streamers, results):
+        if isinstance(helper_file_id, Exception):
+            logger.warning(f"Client {helper_index} could not resolve message {message_id}: {helper_file_id}")
+            continue
+        if helper_file_id.unique_id != file_id.unique_id:
+            continue
+        stripes.append((helper_index, streamer, helper_file_id))
+    return stripes
+
+
 async def media_streamer(
     request: web.Request,
     message_id: int,
@@ -288,12 +445,11 @@ async def media_streamer(
     custom_filename: str = None,
     link_info: Optional[dict] = None,
 ):
-    index = min(work_loads, key=work_loads.get)
+    index = utils.load_balancer.select(utils.streamers.known_dc(message_id), utils.streamers.has_media_session)
     faster_client = multi_clients[index]
     
-    tg_connect = class_cache.get(faster_client, utils.ByteStreamer(faster_client))
-    if faster_client not in class_cache: class_cache[faster_client] = tg_connect
-        
+    tg_connect = utils.streamers.get(faster_client)
+
     file_id = await tg_connect.get_file_properties(message_id)
     
     if utils.get_hash(file_id.unique_id, Var.HASH_LENGTH) != secure_hash:
@@ -358,7 +514,7 @@ async def media_streamer(
 
     if range_header and _if_range_allows_partial(if_range_header, etag_value, last_modified_dt):
         try:
-            from_bytes, until_bytes, is_partial = _parse_range_header(range_header, file_size)
+            ranges, is_partial = _parse_range_header(range_header, file_size)
         except ValueError:
             error_headers = dict(base_headers)
             error_headers["Content-Range"] = f"bytes */{file_size}"
@@ -369,16 +525,15 @@ async def media_streamer(
                 headers=error_headers,
             )
     else:
-        from_bytes, until_bytes, is_partial = 0, file_size - 1, False
+        ranges, is_partial = [(0, file_size - 1)], False
 
+    if len(ranges) > 1:
+        return await _multipart_response(request, tg_connect, file_id, index, ranges, base_headers, mime_type)
+
+    from_bytes, until_bytes = ranges[0]
     req_length = max(until_bytes - from_bytes + 1, 0)
 
-    chunk_size = 1024 * 1024
-    offset = from_bytes - (from_bytes % chunk_size)
-    first_part_cut = from_bytes - offset
-    span = max(until_bytes - offset + 1, 0)
-    part_count = math.ceil(span / chunk_size) if span else 0
-    last_part_cut = (until_bytes % chunk_size) + 1 if part_count else 0
+    offset, first_part_cut, last_part_cut, part_count, chunk_size = _plan_fetch(from_bytes, until_bytes)
 
     if part_count == 0:
         error_headers = dict(base_headers)
@@ -390,7 +545,13 @@ async def media_streamer(
             headers=error_headers,
         )
 
-    body = tg_connect.yield_file(file_id, index, offset, first_part_cut, last_part_cut, part_count, chunk_size)
+    stripes = []
+    if request.method != "HEAD" and Var.MULTI_CLIENT and req_length >= Var.STRIPE_MIN_SIZE_MB * 1024 * 1024:
+        stripes = await _get_stripe_sources(index, message_id, file_id)
+
+    body = tg_connect.yield_file(
+        file_id, index, offset, first_part_cut, last_part_cut, part_count, chunk_size, stripes=stripes
+    )
 
     headers = dict(base_headers)
     headers["Content-Length"] = str(req_length)
@@ -404,18 +565,63 @@ async def media_streamer(
         return web.Response(status=status_code, headers=headers)
 
     resp = web.StreamResponse(status=status_code, headers=headers)
+    await _prepare_stream(request, resp)
+
+    await _write_body(request, resp, body)
+    return resp
+
+
+async def _multipart_response(request: web.Request, tg_connect, file_id, index: int, ranges, base_headers: dict, mime_type: str):
+    boundary = secrets.token_hex(16)
+    headers = dict(base_headers)
+    headers["Content-Type"] = f"multipart/byteranges; boundary={boundary}"
+    headers["Content-Length"] = str(_multipart_length(ranges, boundary, mime_type, file_id.file_size))
+
+    if request.method == "HEAD":
+        return web.Response(status=206, headers=headers)
+
+    resp = web.StreamResponse(status=206, headers=headers)
+    await _prepare_stream(request, resp)
+
+    body = _multipart_body(tg_connect, file_id, index, ranges, boundary, mime_type)
+    await _write_body(request, resp, body)
+    return resp
+
+
+async def _prepare_stream(request: web.Request, resp: web.StreamResponse) -> None:
+    # Remember the response once headers are out; from then on the handler
+    # must not answer with a fresh one.
+    request["stream_response"] = resp
     await resp.prepare(request)
 
-    async for chunk in body:
-        try:
+
+async def _write_body(request: web.Request, resp: web.StreamResponse, body) -> None:
+    """Pump ``body`` into ``resp`` and finish the response.
+
+    ``resp.write`` already drains once 64 KiB are buffered, so an explicit
+    drain is only issued while the transport sits above its high-water mark
+    instead of after every chunk.
+    """
+
+    transport = request.transport
+    try:
+        async for chunk in body:
             await resp.write(chunk)
-            await resp.drain()
-        except (ConnectionResetError, asyncio.CancelledError):
-            break
+            if transport is None or transport.get_write_buffer_size() > transport.get_write_buffer_limits()[1]:
+                await resp.drain()
+    except (ConnectionResetError, asyncio.CancelledError):
+        # The client left or the handler was cancelled, either mid-write or
+        # while waiting on Telegram. Abort the socket: a paused client would
+        # block write_eof forever and the body can't be completed anyway.
+        if transport is not None:
+            transport.abort()
+        return
+    finally:
+        # Close the generator right away so in-flight prefetches are cancelled
+        # as soon as the client goes away.
+        await body.aclose()
 
     try:
         await resp.write_eof()
     except (ConnectionResetError, asyncio.CancelledError):
         pass
-
-    return resp
@@ -1,4 +1,7 @@
 from .keepalive import ping_server
 from .time_format import get_readable_time
 from .file_properties import get_hash, get_name
-from .custom_dl import ByteStreamer
+from .chunk_cache import chunk_cache, memory_cache
+from .load_balancer import load_balancer
+from .flow_control import active_streams, stream_budget
+from .custom_dl import MAX_CHUNK_SIZE, ByteStreamer, choose_chunk_size, get_link_dc_ids, stream_stats, streamers
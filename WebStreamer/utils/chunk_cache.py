@@ -0,0 +1,258 @@
+# WebStreamer/utils/chunk_cache.py
+import os
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Optional, Set, Tuple, Union
+from WebStreamer import Var
+
+logger = logging.getLogger("chunk_cache")
+
+TAIL_SUFFIX = ".tail"
+# Largest GetFile block. Smaller reads are aligned inside one of these, so
+# they can be answered from a cached full block at the enclosing offset.
+BLOCK_SIZE = 1024 * 1024
+
+
+def _covers(entry_size: Optional[int], is_tail: bool, end: int) -> bool:
+    return entry_size is not None and (entry_size >= end or is_tail)
+
+
+class ChunkCache:
+    """Content-addressed on-disk cache of GetFile chunks.
+
+    Chunks are stored as ``<dir>/<file_unique_id>/<offset>`` and evicted in
+    LRU order once the total size goes over ``max_bytes``. A chunk shorter
+    than the requested limit is the end of the file and is stored with a
+    ``.tail`` suffix, so it can answer any later request at that offset.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[Tuple[str, int], Tuple[int, bool]]" = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+        self._writing: Set[Tuple[str, int]] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _path(self, unique_id: str, offset: int, is_tail: bool) -> str:
+        return os.path.join(self.cache_dir, unique_id, f"{offset}{TAIL_SUFFIX if is_tail else ''}")
+
+    def _scan(self) -> list:
+        found = []
+        if not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir, exist_ok=True)
+            return found
+        for unique_id in os.listdir(self.cache_dir):
+            file_dir = os.path.join(self.cache_dir, unique_id)
+            if not os.path.isdir(file_dir):
+                continue
+            for name in os.listdir(file_dir):
+                is_tail = name.endswith(TAIL_SUFFIX)
+                offset_str = name[:-len(TAIL_SUFFIX)] if is_tail else name
+                if not offset_str.isdigit():
+                    continue
+                stat = os.stat(os.path.join(file_dir, name))
+                found.append((stat.st_atime, unique_id, int(offset_str), stat.st_size, is_tail))
+        found.sort()
+        return found
+
+    async def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        async with self._load_lock:
+            if self._loaded:
+                return
+            stale = []
+            for _, unique_id, offset, size, is_tail in await asyncio.to_thread(self._scan):
+                key = (unique_id, offset)
+                previous = self.entries.get(key)
+                if previous:
+                    # Both a block and a tail exist for this offset, left
+                    # over from a replacement; keep the one that covers more.
+                    if previous[1] or previous[0] >= size:
+                        stale.append(self._path(unique_id, offset, is_tail))
+                        continue
+                    stale.append(self._path(unique_id, offset, previous[1]))
+                    self._forget(key)
+                self.entries[key] = (size, is_tail)
+                self.total_bytes += size
+            if stale:
+                await asyncio.to_thread(self._remove, stale)
+            self._loaded = True
+            logger.info(f"Loaded {len(self.entries)} cached chunks ({self.total_bytes / 1024 / 1024:.1f} MB)")
+
+    async def get(self, unique_id: str, offset: int, limit: int) -> Optional[Union[bytes, memoryview]]:
+        if not self.enabled:
+            return None
+        await self._ensure_loaded()
+        key, start = (unique_id, offset), 0
+        entry = self.entries.get(key)
+        if not (entry and _covers(entry[0], entry[1], limit)) and offset % BLOCK_SIZE:
+            start = offset % BLOCK_SIZE
+            key = (unique_id, offset - start)
+            entry = self.entries.get(key)
+        if not (entry and _covers(entry[0], entry[1], start + limit)):
+            self.misses += 1
+            return None
+        try:
+            data = await asyncio.to_thread(self._read, self._path(unique_id, key[1], entry[1]))
+        except OSError:
+            self._forget(key)
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return data if start == 0 and len(data) <= limit else memoryview(data)[start:start + limit]
+
+    def put_nowait(self, unique_id: str, offset: int, data: bytes, is_tail: bool) -> None:
+        """Store a chunk in the background without delaying the caller."""
+        key = (unique_id, offset)
+        if not self.enabled or not data or key in self._writing:
+            return
+        cached = self.entries.get(key)
+        if cached and (cached[1] or cached[0] >= len(data)):
+            return
+        self._writing.add(key)
+        asyncio.create_task(self._put(key, data, is_tail))
+
+    async def _put(self, key: Tuple[str, int], data: bytes, is_tail: bool) -> None:
+        try:
+            await self._ensure_loaded()
+            await asyncio.to_thread(self._write, self._path(key[0], key[1], is_tail), data)
+            previous = self.entries.get(key)
+            self._forget(key)
+            self.entries[key] = (len(data), is_tail)
+            self.total_bytes += len(data)
+            if previous and previous[1] != is_tail:
+                # The replaced entry lives under the other file name; don't
+                # leave it on disk outside the size cap.
+                await asyncio.to_thread(self._remove, [self._path(key[0], key[1], previous[1])])
+            await self._evict()
+        except OSError as e:
+            logger.warning(f"Failed to cache chunk {key}: {e}")
+        finally:
+            self._writing.discard(key)
+
+    async def _evict(self) -> None:
+        victims = []
+        while self.total_bytes > self.max_bytes and self.entries:
+            key, (size, is_tail) = self.entries.popitem(last=False)
+            self.total_bytes -= size
+            victims.append(self._path(key[0], key[1], is_tail))
+        if victims:
+            await asyncio.to_thread(self._remove, victims)
+
+    def _forget(self, key: Tuple[str, int]) -> None:
+        entry = self.entries.pop(key, None)
+        if entry:
+            self.total_bytes -= entry[0]
+
+    @staticmethod
+    def _read(path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+
+    @staticmethod
+    def _write(path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".part"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _remove(paths: list) -> None:
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            parent = os.path.dirname(path)
+            try:
+                os.rmdir(parent)
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "chunks": len(self.entries),
+            "size_mb": round(self.total_bytes / 1024 / 1024, 2),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class MemoryChunkCache:
+    """Small in-RAM LRU cache with a hard byte budget.
+
+    Used for the first and last chunks of a file, which players request over
+    and over while probing for the moov atom and seeking.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[Tuple[str, int], Tuple[bytes, bool]]" = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, unique_id: str, offset: int, limit: int) -> Optional[Union[bytes, memoryview]]:
+        key, start = (unique_id, offset), 0
+        entry = self.entries.get(key)
+        if not (entry and _covers(len(entry[0]), entry[1], limit)) and offset % BLOCK_SIZE:
+            start = offset % BLOCK_SIZE
+            key = (unique_id, offset - start)
+            entry = self.entries.get(key)
+        if not (entry and _covers(len(entry[0]), entry[1], start + limit)):
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        data = entry[0]
+        return data if start == 0 and len(data) <= limit else memoryview(data)[start:start + limit]
+
+    def put(self, unique_id: str, offset: int, data: Union[bytes, memoryview], is_tail: bool) -> None:
+        if not self.enabled or not data or len(data) > self.max_bytes:
+            return
+        if isinstance(data, memoryview):
+            # Don't pin the larger buffer the view was cut from.
+            data = data.tobytes()
+        key = (unique_id, offset)
+        cached = self.entries.get(key)
+        if cached and (cached[1] or len(cached[0]) >= len(data)):
+            # Keep the larger block; small probes are served from it.
+            return
+        old = self.entries.pop(key, None)
+        if old:
+            self.total_bytes -= len(old[0])
+        self.entries[key] = (data, is_tail)
+        self.total_bytes += len(data)
+        while self.total_bytes > self.max_bytes:
+            _, (evicted, _) = self.entries.popitem(last=False)
+            self.total_bytes -= len(evicted)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "chunks": len(self.entries),
+            "size_mb": round(self.total_bytes / 1024 / 1024, 2),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+chunk_cache = ChunkCache(Var.CHUNK_CACHE_DIR, Var.CHUNK_CACHE_SIZE_MB * 1024 * 1024)
+memory_cache = MemoryChunkCache(Var.MEMORY_CACHE_SIZE_MB * 1024 * 1024)
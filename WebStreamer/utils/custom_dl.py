@@ -1,31 +1,145 @@
 # WebStreamer/utils/custom_dl.py
 import math
+import time
 import asyncio
+import functools
 import logging
 from WebStreamer import Var
-from typing import Dict, Union
-from WebStreamer.bot import work_loads
+from collections import deque
+from typing import AsyncGenerator, Deque, Dict, List, Optional, Set, Tuple, Union
+from WebStreamer.bot import StreamBot, multi_clients, work_loads
+from WebStreamer.bot.database import get_link_file_properties, get_recent_file_ids, update_link_file_properties
 from pyrogram import Client, utils, raw
+from .chunk_cache import chunk_cache, memory_cache
+from .file_id_cache import FileIdCache
+from .media_pool import MediaSessionPool
+from .load_balancer import load_balancer
+from .flow_control import active_streams, stream_budget
 from .file_properties import get_file_ids
-from pyrogram.session import Session, Auth
-from pyrogram.errors import AuthBytesInvalid, FloodWait
+from pyrogram.session import Session
+from pyrogram.errors import FloodWait, InternalServerError, RPCError, ServiceUnavailable
 from WebStreamer.errors import FIleNotFound
 from pyrogram.file_id import FileId, FileType, ThumbnailSource
 
 logger = logging.getLogger("streamer")
 
+stream_stats: Dict[str, int] = {
+    "prefetch_window": Var.PREFETCH_WINDOW,
+    "chunks_in_flight": 0,
+    "coalesced_chunks": 0,
+    "stream_recoveries": 0,
+    "failovers": 0,
+}
+
+inflight_chunks: Dict[Tuple[str, int, int, int], list] = {}
+
+# upload.GetFile limits must be multiples of 4 KiB, at most 1 MiB, divide
+# the offset and never cross a 1 MiB boundary. Powers of two in this range
+# with block-aligned offsets satisfy all of that.
+MIN_CHUNK_SIZE = 4 * 1024
+MAX_CHUNK_SIZE = 1024 * 1024
+
+MAX_STREAM_RECOVERIES = 3
+REFERENCE_ERRORS = {
+    "FILE_REFERENCE_EMPTY",
+    "FILE_REFERENCE_EXPIRED",
+    "FILE_REFERENCE_INVALID",
+    "FILE_ID_INVALID",
+    "LOCATION_INVALID",
+}
+
+
+def choose_chunk_size(length: int) -> int:
+    """Smallest valid GetFile block that covers ``length`` bytes."""
+    chunk_size = MIN_CHUNK_SIZE
+    while chunk_size < length and chunk_size < MAX_CHUNK_SIZE:
+        chunk_size *= 2
+    return chunk_size
+
+
+def is_reference_error(error: Exception) -> bool:
+    return isinstance(error, RPCError) and error.ID in REFERENCE_ERRORS
+
+
+def is_recoverable_error(error: Exception) -> bool:
+    return is_reference_error(error) or isinstance(
+        error, (FloodWait, InternalServerError, ServiceUnavailable, ConnectionError, TimeoutError)
+    )
+
+
+def _discard_flight(key: Tuple[str, int, int, int], task: asyncio.Task) -> None:
+    flight = inflight_chunks.get(key)
+    if flight is not None and flight[0] is task:
+        del inflight_chunks[key]
+
+
+def _drop_tasks(tasks) -> None:
+    """Cancel prefetch tasks, consuming the error of those already finished
+    so it isn't logged as never retrieved."""
+    for task in tasks:
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled():
+            task.exception()
+
 class ByteStreamer:
     def __init__(self, client: Client):
-        self.clean_timer = 30 * 60
         self.client: Client = client
-        self.cached_file_ids: Dict[int, FileId] = {}
-        asyncio.create_task(self.clean_cache())
+        self.cached_file_ids = FileIdCache(Var.FILE_ID_CACHE_SIZE, Var.FILE_ID_CACHE_TTL)
+        self.media_pool = MediaSessionPool(client, Var.MEDIA_SESSIONS_PER_DC)
+        self._refreshing: Set[int] = set()
 
     async def get_file_properties(self, message_id: int) -> FileId:
-        if message_id not in self.cached_file_ids:
-            await self.generate_file_properties(message_id)
+        file_id, needs_refresh = self.cached_file_ids.get(message_id)
+        if file_id is None:
+            file_id = await self.load_stored_file_properties(message_id)
+        if file_id is None:
+            file_id = await self.generate_file_properties(message_id)
             logger.debug(f"Cached file properties for message with ID {message_id}")
-        return self.cached_file_ids[message_id]
+        elif needs_refresh:
+            self.schedule_refresh(message_id, from_telegram=False)
+        return file_id
+
+    def schedule_refresh(self, message_id: int, from_telegram: bool = True) -> None:
+        if message_id not in self._refreshing:
+            self._refreshing.add(message_id)
+            asyncio.create_task(self._refresh_file_properties(message_id, from_telegram))
+
+    async def _refresh_file_properties(self, message_id: int, from_telegram: bool) -> None:
+        try:
+            if from_telegram or await self.load_stored_file_properties(message_id) is None:
+                await self.generate_file_properties(message_id)
+        except FIleNotFound:
+            self.cached_file_ids.pop(message_id)
+        except Exception as e:
+            logger.debug(f"Background refresh of message {message_id} failed: {e}")
+        finally:
+            self._refreshing.discard(message_id)
+
+    async def load_stored_file_properties(self, message_id: int) -> Optional[FileId]:
+        """Load the FileId saved with the link, skipping Telegram entirely.
+
+        Stored file IDs were issued to the main bot, so other clients always
+        resolve the message themselves.
+        """
+        if self.client is not StreamBot:
+            return None
+        stored = await get_link_file_properties(message_id)
+        if not stored:
+            return None
+        try:
+            file_id = FileId.decode(stored["file_id"])
+        except Exception as e:
+            logger.warning(f"Stored file ID of message {message_id} is invalid: {e}")
+            return None
+        setattr(file_id, "file_size", stored["file_size"] or 0)
+        setattr(file_id, "mime_type", stored["mime_type"] or "")
+        setattr(file_id, "file_name", stored["file_name"] or "")
+        setattr(file_id, "unique_id", stored["file_unique_id"])
+        setattr(file_id, "message_id", message_id)
+        self.cached_file_ids.set(message_id, file_id)
+        logger.debug(f"Loaded stored file properties for message with ID {message_id}")
+        return file_id
     
     async def generate_file_properties(self, message_id: int) -> FileId:
         file_id = await get_file_ids(self.client, Var.BIN_CHANNEL, message_id)
@@ -33,60 +147,17 @@ class ByteStreamer:
         if not file_id:
             logger.debug(f"Message with ID {message_id} not found")
             raise FIleNotFound
-        self.cached_file_ids[message_id] = file_id
+        setattr(file_id, "message_id", message_id)
+        self.cached_file_ids.set(message_id, file_id)
         logger.debug(f"Cached media message with ID {message_id}")
-        return self.cached_file_ids[message_id]
+        if self.client is StreamBot:
+            asyncio.create_task(update_link_file_properties(
+                message_id, file_id.encode(), file_id.file_size, file_id.mime_type
+            ))
+        return file_id
 
     async def generate_media_session(self, client: Client, file_id: FileId) -> Session:
-        media_session = client.media_sessions.get(file_id.dc_id, None)
-
-        if media_session is None:
-            if file_id.dc_id != await client.storage.dc_id():
-                media_session = Session(
-                    client,
-                    file_id.dc_id,
-                    await Auth(
-                        client, file_id.dc_id, await client.storage.test_mode()
-                    ).create(),
-                    await client.storage.test_mode(),
-                    is_media=True,
-                )
-                await media_session.start()
-
-                for _ in range(6):
-                    exported_auth = await client.invoke(
-                        raw.functions.auth.ExportAuthorization(dc_id=file_id.dc_id)
-                    )
-
-                    try:
-                        await media_session.invoke(
-                            raw.functions.auth.ImportAuthorization(
-                                id=exported_auth.id, bytes=exported_auth.bytes
-                            )
-                        )
-                        break
-                    except AuthBytesInvalid:
-                        logger.debug(
-                            f"Invalid authorization bytes for DC {file_id.dc_id}"
-                        )
-                        continue
-                else:
-                    await media_session.stop()
-                    raise AuthBytesInvalid
-            else:
-                media_session = Session(
-                    client,
-                    file_id.dc_id,
-                    await client.storage.auth_key(),
-                    await client.storage.test_mode(),
-                    is_media=True,
-                )
-                await media_session.start()
-            logger.debug(f"Created media session for DC {file_id.dc_id}")
-            client.media_sessions[file_id.dc_id] = media_session
-        else:
-            logger.debug(f"Using cached media session for DC {file_id.dc_id}")
-        return media_session
+        return await self.media_pool.get(file_id.dc_id)
 
 
     @staticmethod
@@ -131,6 +202,86 @@ class ByteStreamer:
             )
         return location
 
+    async def fetch_chunk(self, file_id: FileId, location, offset: int, chunk_size: int) -> bytes:
+        retries = 0
+        while True:
+            async with self.media_pool.session(file_id.dc_id) as media_session:
+                try:
+                    r = await media_session.invoke(
+                        raw.functions.upload.GetFile(
+                            location=location, offset=offset, limit=chunk_size
+                        ),
+                        sleep_threshold=0,
+                    )
+                    if not isinstance(r, raw.types.upload.File):
+                        raise TypeError(f"Received unexpected type {type(r)} when fetching chunk.")
+                    return r.bytes
+                except TimeoutError:
+                    retries += 1
+                    if retries > 5:
+                        logger.error("Max retries reached for TimeoutError. Aborting.")
+                        await self.media_pool.discard(file_id.dc_id, media_session)
+                        raise
+                    logger.warning(f"TimeoutError when fetching offset {offset}. Retrying...")
+                except FloodWait as e:
+                    load_balancer.note_flood_wait(self.client, e.value)
+                    if e.value > Var.FLOOD_WAIT_FAILOVER:
+                        # Let yield_file move this part to another client.
+                        raise
+                    logger.warning(f"FloodWait of {e.value}s on offset {offset}. Sleeping...")
+                    await asyncio.sleep(e.value)
+                    continue
+                except (ConnectionError, OSError):
+                    await self.media_pool.discard(file_id.dc_id, media_session)
+                    raise
+            await asyncio.sleep(2)
+
+    async def get_chunk(self, file_id: FileId, location, offset: int, chunk_size: int) -> bytes:
+        # Players keep re-reading the head and tail of a file (moov atom,
+        # seek probes), so those chunks also go through the RAM tier.
+        is_edge = memory_cache.enabled and (offset == 0 or offset + chunk_size >= file_id.file_size)
+        if is_edge:
+            chunk = memory_cache.get(file_id.unique_id, offset, chunk_size)
+            if chunk is not None:
+                return chunk
+
+        # Single-flight: concurrent viewers of the same chunk share one
+        # request. The shared task is shielded so a disconnecting viewer
+        # doesn't cancel it for the others; it is only cancelled once the
+        # last waiter is gone. Only requests on the same client are joined,
+        # so one client's FloodWait or expired reference never surfaces in
+        # another client's stream.
+        key = (self.client.name, file_id.media_id, offset, chunk_size)
+        flight = inflight_chunks.get(key)
+        if flight is None or flight[0].done():
+            task = asyncio.create_task(self._load_chunk(file_id, location, offset, chunk_size))
+            flight = inflight_chunks[key] = [task, 0]
+            task.add_done_callback(functools.partial(_discard_flight, key))
+        else:
+            stream_stats["coalesced_chunks"] += 1
+        flight[1] += 1
+        try:
+            chunk = await asyncio.shield(flight[0])
+        finally:
+            flight[1] -= 1
+            if flight[1] == 0 and not flight[0].done():
+                # Unregister before cancelling: the done-callback only runs
+                # on a later loop turn, and a viewer arriving in between
+                # must start a fresh request instead of joining this one.
+                _discard_flight(key, flight[0])
+                flight[0].cancel()
+
+        if is_edge:
+            memory_cache.put(file_id.unique_id, offset, chunk, len(chunk) < chunk_size)
+        return chunk
+
+    async def _load_chunk(self, file_id: FileId, location, offset: int, chunk_size: int) -> bytes:
+        chunk = await chunk_cache.get(file_id.unique_id, offset, chunk_size)
+        if chunk is None:
+            chunk = await self.fetch_chunk(file_id, location, offset, chunk_size)
+            chunk_cache.put_nowait(file_id.unique_id, offset, chunk, len(chunk) < chunk_size)
+        return chunk
+
     async def yield_file(
         self,
         file_id: FileId,
@@ -140,65 +291,270 @@ class ByteStreamer:
         last_part_cut: int,
         part_count: int,
         chunk_size: int,
-    ) -> Union[str, None]:
+        stripes: Optional[List[Tuple[int, "ByteStreamer", FileId]]] = None,
+    ) -> AsyncGenerator[Union[bytes, memoryview], None]:
         client = self.client
         work_loads[index] += 1
         logger.debug(f"Starting to yielding file with client {index}.")
-        media_session = await self.generate_media_session(client, file_id)
+        await self.generate_media_session(client, file_id)
         current_part = 1
         location = await self.get_location(file_id)
-        retries = 0
+
+        # Each source is [client index, streamer, file id, location]. Part N
+        # is fetched by sources[N % len(sources)], so extra clients passed in
+        # ``stripes`` each download an interleaved share of the file.
+        sources = [[index, self, file_id, location]]
+        for stripe_index, streamer, stripe_file_id in stripes or []:
+            try:
+                await streamer.generate_media_session(streamer.client, stripe_file_id)
+            except Exception as e:
+                logger.warning(f"Skipping client {stripe_index} for striped download: {e}")
+                continue
+            work_loads[stripe_index] += 1
+            sources.append([stripe_index, streamer, stripe_file_id, await self.get_location(stripe_file_id)])
+        if len(sources) > 1:
+            logger.debug(f"Striping file across clients {[src[0] for src in sources]}.")
+
+        # Up to PREFETCH_WINDOW GetFile requests per source stay in flight;
+        # they are consumed in order and whatever is left is cancelled on exit.
+        # The read-ahead is also capped by the per-response byte budget and
+        # by the global ceiling, so slow clients can't pile up buffers.
+        window = max(min(Var.PREFETCH_WINDOW * len(sources), Var.STREAM_BUFFER_MB * 1024 * 1024 // chunk_size), 1)
+        pending: Deque[asyncio.Task] = deque()
+        state = active_streams.open(file_id.message_id, index)
+        next_part = 1
+        recoveries = 0
+
+        # Bytes each source still has to deliver, for the load balancer.
+        bytes_left: Dict[int, int] = {}
+        for part in range(part_count):
+            source_index = sources[part % len(sources)][0]
+            bytes_left[source_index] = bytes_left.get(source_index, 0) + chunk_size
+        for source_index, nbytes in bytes_left.items():
+            load_balancer.stats_for(source_index).bytes_in_flight += nbytes
 
         try:
             while current_part <= part_count:
-                try:
-                    r = await media_session.invoke(
-                        raw.functions.upload.GetFile(
-                            location=location, offset=offset, limit=chunk_size
-                        )
-                    )
-                    if isinstance(r, raw.types.upload.File):
-                        retries = 0  
-                        chunk = r.bytes
-                        if not chunk:
-                            logger.warning(f"Got empty chunk on part {current_part} for message {file_id.media_id}")
-                            break
-                        
-                        if part_count == 1:
-                            yield chunk[first_part_cut:last_part_cut]
-                        elif current_part == 1:
-                            yield chunk[first_part_cut:]
-                        elif current_part == part_count:
-                            yield chunk[:last_part_cut]
-                        else:
-                            yield chunk
-
-                        current_part += 1
-                        offset += chunk_size
-                    else:
-                        logger.warning(f"Received unexpected type {type(r)} when fetching chunk.")
+                while len(pending) < window and next_part <= part_count:
+                    if not stream_budget.reserve(chunk_size, force=not pending):
                         break
+                    _, part_streamer, part_file_id, part_location = sources[(next_part - 1) % len(sources)]
+                    part_offset = offset + (next_part - 1) * chunk_size
+                    pending.append(asyncio.create_task(
+                        part_streamer.get_chunk(part_file_id, part_location, part_offset, chunk_size)
+                    ))
+                    stream_stats["chunks_in_flight"] += 1
+                    next_part += 1
 
-                except TimeoutError:
-                    logger.warning(f"TimeoutError when fetching part {current_part}. Retrying...")
-                    retries += 1
-                    if retries > 5:
-                        logger.error("Max retries reached for TimeoutError. Aborting.")
-                        break
-                    await asyncio.sleep(2)
-                except FloodWait as e:
-                    logger.warning(f"FloodWait of {e.value}s on part {current_part}. Sleeping...")
-                    await asyncio.sleep(e.value)
+                state.queue_depth = len(pending)
+                state.buffered_bytes = sum(chunk_size for t in pending if t.done())
+                task = pending.popleft()
+                waited_at = time.monotonic()
+                try:
+                    chunk = await task
                 except Exception as e:
-                    logger.error(f"Unexpected error in yield_file loop: {e}", exc_info=True)
+                    if recoveries >= MAX_STREAM_RECOVERIES or not is_recoverable_error(e):
+                        logger.error(f"Unexpected error in yield_file loop: {e}", exc_info=True)
+                        break
+                    recoveries += 1
+                    # Drop the read-ahead and resume from the failed part once
+                    # its source has been repaired; the response stays open.
+                    _drop_tasks(pending)
+                    stream_stats["chunks_in_flight"] -= len(pending)
+                    stream_budget.release(len(pending) * chunk_size)
+                    pending.clear()
+                    next_part = current_part
+                    source = sources[(current_part - 1) % len(sources)]
+                    try:
+                        await self.recover_source(source, e, bytes_left)
+                    except Exception as recover_error:
+                        logger.error(f"Could not recover stream of message {file_id.message_id}: {recover_error}")
+                        break
+                    stream_stats["stream_recoveries"] += 1
+                    continue
+                finally:
+                    stream_stats["chunks_in_flight"] -= 1
+                    stream_budget.release(chunk_size)
+                    state.upstream_time += time.monotonic() - waited_at
+
+                if not chunk:
+                    logger.warning(f"Got empty chunk on part {current_part} for message {file_id.media_id}")
                     break
+
+                recoveries = 0
+                source_index = sources[(current_part - 1) % len(sources)][0]
+                source_stats = load_balancer.stats_for(source_index)
+                source_stats.record(len(chunk))
+                source_stats.bytes_in_flight -= chunk_size
+                bytes_left[source_index] -= chunk_size
+
+                # Boundary parts are cut through a memoryview so up to a MiB
+                # isn't copied per seek; the transport accepts views as is.
+                if part_count == 1:
+                    part = memoryview(chunk)[first_part_cut:last_part_cut]
+                elif current_part == 1:
+                    part = memoryview(chunk)[first_part_cut:]
+                elif current_part == part_count:
+                    part = memoryview(chunk)[:last_part_cut]
+                else:
+                    part = chunk
+
+                # The generator is suspended while the route writes the part,
+                # so that time is how long the client kept us waiting.
+                state.writing()
+                yield part
+                state.sent(len(part))
+
+                current_part += 1
         finally:
+            _drop_tasks(pending)
+            stream_stats["chunks_in_flight"] -= len(pending)
+            stream_budget.release(len(pending) * chunk_size)
+            active_streams.close(state)
             logger.debug(f"Finished yielding file with {current_part-1} parts.")
-            work_loads[index] -= 1
+            for source in sources:
+                work_loads[source[0]] -= 1
+            for source_index, nbytes in bytes_left.items():
+                load_balancer.stats_for(source_index).bytes_in_flight -= nbytes
+
+    async def recover_source(self, source: list, error: Exception, bytes_left: Dict[int, int]) -> None:
+        """Repair a stream source after a failed chunk, in place.
+
+        Reference and location errors re-resolve the message to get a fresh
+        file reference, a long FloodWait hands the source over to another
+        client, and transient DC errors just back off briefly.
+        """
+        source_index, streamer, file_id, _ = source
+        if is_reference_error(error):
+            logger.warning(f"File reference of message {file_id.message_id} is no longer valid, refreshing it.")
+            file_id = await streamer.generate_file_properties(file_id.message_id)
+            await streamer.generate_media_session(streamer.client, file_id)
+            source[2] = file_id
+            source[3] = await streamer.get_location(file_id)
+        elif isinstance(error, FloodWait):
+            if not await self.failover_source(source, bytes_left):
+                logger.warning(f"No client available for failover, sleeping {error.value}s for client {source_index}.")
+                await asyncio.sleep(error.value)
+        else:
+            logger.warning(f"Transient error while streaming message {file_id.message_id}: {error}. Retrying...")
+            await asyncio.sleep(1)
+
+    @staticmethod
+    async def failover_source(source: list, bytes_left: Dict[int, int]) -> bool:
+        """Move a source whose client is cooling down to a healthy client."""
+        old_index, _, old_file_id, _ = source
+        for new_index in load_balancer.failover_candidates(exclude=set(bytes_left) | {old_index}):
+            new_streamer = streamers.get(multi_clients[new_index])
+            try:
+                new_file_id = await new_streamer.get_file_properties(old_file_id.message_id)
+                await new_streamer.generate_media_session(new_streamer.client, new_file_id)
+            except Exception as e:
+                logger.warning(f"Client {new_index} could not take over message {old_file_id.message_id}: {e}")
+                continue
+
+            work_loads[old_index] -= 1
+            work_loads[new_index] += 1
+            remaining = bytes_left.pop(old_index, 0)
+            load_balancer.stats_for(old_index).bytes_in_flight -= remaining
+            load_balancer.stats_for(new_index).bytes_in_flight += remaining
+            bytes_left[new_index] = remaining
+            source[:] = [new_index, new_streamer, new_file_id, await new_streamer.get_location(new_file_id)]
+            stream_stats["failovers"] += 1
+            logger.info(f"Moved stream of message {old_file_id.message_id} from client {old_index} to {new_index}.")
+            return True
+        return False
 
     
-    async def clean_cache(self) -> None:
+    def clean_cache(self) -> None:
+        removed = self.cached_file_ids.prune()
+        logger.debug(f"Pruned {removed} expired entries from the cache")
+
+
+class StreamerRegistry:
+    """One lazily created ByteStreamer per client.
+
+    Cache maintenance for every streamer runs on a single shared task instead
+    of one endless task per instance.
+    """
+
+    def __init__(self, clean_timer: int = 5 * 60):
+        self.clean_timer = clean_timer
+        self.streamers: Dict[Client, ByteStreamer] = {}
+        self._maintenance_task: Optional[asyncio.Task] = None
+
+    def get(self, client: Client) -> ByteStreamer:
+        streamer = self.streamers.get(client)
+        if streamer is None:
+            streamer = self.streamers[client] = ByteStreamer(client)
+            logger.debug(f"Created streamer for client {client.name}")
+        if self._maintenance_task is None or self._maintenance_task.done():
+            self._maintenance_task = asyncio.create_task(self._maintain())
+        return streamer
+
+    async def _maintain(self) -> None:
         while True:
             await asyncio.sleep(self.clean_timer)
-            self.cached_file_ids.clear()
-            logger.debug("Cleaned the cache")
\ No newline at end of file
+            for streamer in list(self.streamers.values()):
+                streamer.clean_cache()
+                try:
+                    await streamer.media_pool.health_check()
+                except Exception as e:
+                    logger.warning(f"Media session health check failed: {e}")
+
+    def has_media_session(self, client: Client, dc_id: int) -> bool:
+        streamer = self.streamers.get(client)
+        return streamer is not None and streamer.media_pool.has_dc(dc_id)
+
+    def known_dc(self, message_id: int) -> Optional[int]:
+        """DC of a message already resolved by any streamer, without a lookup."""
+        for streamer in self.streamers.values():
+            file_id = streamer.cached_file_ids.peek(message_id)
+            if file_id is not None:
+                return file_id.dc_id
+        return None
+
+    async def prewarm(self, clients: List[Client], dc_ids: Set[int]) -> None:
+        """Open authorized media sessions to every DC for every client in parallel."""
+        async def warm(client: Client, dc_id: int) -> None:
+            try:
+                await self.get(client).media_pool.fill(dc_id)
+            except Exception as e:
+                logger.warning(f"Could not pre-warm DC {dc_id} for client {client.name}: {e}")
+
+        await asyncio.gather(*(warm(client, dc_id) for client in clients for dc_id in dc_ids))
+
+    async def close(self) -> None:
+        """Stop the maintenance task and every pooled media session."""
+        if self._maintenance_task is not None:
+            self._maintenance_task.cancel()
+        for streamer in self.streamers.values():
+            await streamer.media_pool.close()
+
+    def stats(self) -> Dict[str, int]:
+        task = self._maintenance_task
+        caches = [streamer.cached_file_ids.stats() for streamer in self.streamers.values()]
+        hits = sum(c["hits"] for c in caches)
+        misses = sum(c["misses"] for c in caches)
+        pools = [streamer.media_pool.stats() for streamer in self.streamers.values()]
+        return {
+            "streamers": len(self.streamers),
+            "media_sessions": sum(p["media_sessions"] for p in pools),
+            "media_requests_in_flight": sum(p["media_requests_in_flight"] for p in pools),
+            "maintenance_tasks": int(task is not None and not task.done()),
+            "file_id_cache_entries": sum(c["entries"] for c in caches),
+            "file_id_cache_hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0,
+        }
+
+
+streamers = StreamerRegistry()
+
+
+async def get_link_dc_ids(limit: int = 1000) -> Set[int]:
+    """DCs hosting the files of the most recent links."""
+    dc_ids = set()
+    for encoded in await get_recent_file_ids(limit):
+        try:
+            dc_ids.add(FileId.decode(encoded).dc_id)
+        except Exception:
+            continue
+    return dc_ids
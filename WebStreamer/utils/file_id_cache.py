@@ -0,0 +1,68 @@
+# WebStreamer/utils/file_id_cache.py
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from pyrogram.file_id import FileId
+
+
+class FileIdCache:
+    """Bounded LRU cache of resolved ``FileId`` objects with per-entry TTL.
+
+    Entries older than ``refresh_after`` are still served, but ``get`` flags
+    them so the caller can refresh them in the background before they expire.
+    """
+
+    def __init__(self, max_entries: int, ttl: int, refresh_ratio: float = 0.8):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.refresh_after = ttl * refresh_ratio
+        self._entries: "OrderedDict[int, Tuple[FileId, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, message_id: int) -> Tuple[Optional[FileId], bool]:
+        """Return ``(file_id, needs_refresh)``; ``file_id`` is None on a miss."""
+        entry = self._entries.get(message_id)
+        if entry is None:
+            self.misses += 1
+            return None, False
+        file_id, stored_at = entry
+        age = time.monotonic() - stored_at
+        if age >= self.ttl:
+            del self._entries[message_id]
+            self.misses += 1
+            return None, False
+        self._entries.move_to_end(message_id)
+        self.hits += 1
+        return file_id, age >= self.refresh_after
+
+    def peek(self, message_id: int) -> Optional[FileId]:
+        """Return a live entry without touching LRU order or hit stats."""
+        entry = self._entries.get(message_id)
+        if entry is None or time.monotonic() - entry[1] >= self.ttl:
+            return None
+        return entry[0]
+
+    def set(self, message_id: int, file_id: FileId) -> None:
+        self._entries[message_id] = (file_id, time.monotonic())
+        self._entries.move_to_end(message_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def pop(self, message_id: int) -> Optional[FileId]:
+        entry = self._entries.pop(message_id, None)
+        return entry[0] if entry else None
+
+    def prune(self) -> int:
+        """Drop expired entries and return how many were removed."""
+        now = time.monotonic()
+        expired = [key for key, (_, stored_at) in self._entries.items() if now - stored_at >= self.ttl]
+        for key in expired:
+            del self._entries[key]
+        return len(expired)
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
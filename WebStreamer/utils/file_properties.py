@@ -1,9 +1,10 @@
 # WebStreamer/utils/file_properties.py
+import asyncio
 import hashlib
 from pyrogram import Client
 from pyrogram.types import Message
 from pyrogram.file_id import FileId
-from typing import Any, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 from pyrogram.raw.types.messages import Messages
 from WebStreamer.errors import FIleNotFound
 from datetime import datetime
@@ -19,11 +20,64 @@ async def parse_file_unique_id(message: "Messages") -> Optional[str]:
     if media:
         return media.file_unique_id
 
+# Cache misses arriving within BATCH_WINDOW seconds of each other are resolved
+# with a single multi-ID get_messages call (Telegram allows up to 200 IDs).
+BATCH_WINDOW = 0.005
+MAX_BATCH_SIZE = 200
+_pending_batches: Dict[Tuple[Client, int], Dict[int, List[asyncio.Future]]] = {}
+
+
 async def get_file_ids(client: Client, chat_id: int, message_id: int) -> Optional[FileId]:
-    message = await client.get_messages(chat_id, message_id)
-    if message.empty:
+    key = (client, chat_id)
+    batch = _pending_batches.get(key)
+    if batch is None:
+        batch = _pending_batches[key] = {}
+        asyncio.get_running_loop().call_later(BATCH_WINDOW, _flush_batch, client, chat_id)
+    future = asyncio.get_running_loop().create_future()
+    batch.setdefault(message_id, []).append(future)
+    if len(batch) >= MAX_BATCH_SIZE:
+        _flush_batch(client, chat_id)
+    return await future
+
+
+def _flush_batch(client: Client, chat_id: int) -> None:
+    batch = _pending_batches.pop((client, chat_id), None)
+    if batch:
+        asyncio.create_task(_resolve_batch(client, chat_id, batch))
+
+
+async def _resolve_batch(client: Client, chat_id: int, batch: Dict[int, List[asyncio.Future]]) -> None:
+    message_ids = list(batch)
+    try:
+        messages = await client.get_messages(chat_id, message_ids)
+    except Exception as e:
+        for futures in batch.values():
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+        return
+
+    by_id = {message.id: message for message in messages if message}
+    for message_id in message_ids:
+        try:
+            result = await _file_id_from_message(by_id.get(message_id))
+        except Exception as e:
+            result = e
+        for future in batch[message_id]:
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+async def _file_id_from_message(message: Optional["Message"]) -> FileId:
+    if message is None or message.empty:
         raise FIleNotFound
     media = get_media_from_message(message)
+    if not media:
+        raise FIleNotFound
     file_unique_id = await parse_file_unique_id(message)
     file_id = await parse_file_id(message)
     setattr(file_id, "file_size", getattr(media, "file_size", 0))
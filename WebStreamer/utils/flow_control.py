@@ -0,0 +1,168 @@
+# WebStreamer/utils/flow_control.py
+import time
+import asyncio
+import logging
+import itertools
+from typing import Dict, Optional
+from WebStreamer import Var
+
+logger = logging.getLogger("flow_control")
+
+# How often the reaper looks for idle and crawling responses (seconds).
+REAP_INTERVAL = 10
+
+
+class MemoryBudget:
+    """Byte ceiling shared by the read-ahead buffers of every response.
+
+    Streams reserve a chunk before fetching it and release it once the chunk
+    has been handed to the client. A stream with nothing in flight may always
+    reserve one chunk, so every response keeps making progress.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.reserved = 0
+        self.peak = 0
+        self.throttled = 0
+
+    def reserve(self, nbytes: int, force: bool = False) -> bool:
+        if not force and self.max_bytes and self.reserved + nbytes > self.max_bytes:
+            self.throttled += 1
+            return False
+        self.reserved += nbytes
+        self.peak = max(self.peak, self.reserved)
+        return True
+
+    def release(self, nbytes: int) -> None:
+        self.reserved = max(self.reserved - nbytes, 0)
+
+    def stats(self) -> dict:
+        return {
+            "limit_mb": round(self.max_bytes / 1024 / 1024, 2),
+            "reserved_mb": round(self.reserved / 1024 / 1024, 2),
+            "peak_mb": round(self.peak / 1024 / 1024, 2),
+            "throttled": self.throttled,
+        }
+
+
+class StreamState:
+    """Flow-control figures of one streaming response."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, message_id: int, client_index: int):
+        self.id = next(self._ids)
+        self.message_id = message_id
+        self.client_index = client_index
+        self.started = time.monotonic()
+        self.last_active = self.started
+        self.bytes_sent = 0
+        self.queue_depth = 0
+        self.buffered_bytes = 0
+        # Time spent waiting for the client to take the last chunk vs. for
+        # Telegram to deliver the next one.
+        self.stalled_time = 0.0
+        self.upstream_time = 0.0
+        # Set while the client holds the current chunk; the reaper only
+        # touches streams that are waiting on the client, not on Telegram.
+        self.writing_since: Optional[float] = None
+        self.task = asyncio.current_task()
+        self._checkpoint = (self.started, 0, 0.0)
+
+    def writing(self) -> None:
+        self.writing_since = time.monotonic()
+
+    def sent(self, nbytes: int) -> None:
+        now = time.monotonic()
+        self.bytes_sent += nbytes
+        self.stalled_time += now - self.writing_since
+        self.writing_since = None
+        self.last_active = now
+
+    def reap_reason(self, now: float) -> Optional[str]:
+        """Why this stream should be dropped, or None to keep it.
+
+        Only streams blocked on the client are judged; one waiting on
+        Telegram keeps its window open until the next check.
+        """
+        if self.writing_since is None:
+            return None
+        stalled = self.stalled_time + (now - self.writing_since)
+        if Var.STREAM_IDLE_TIMEOUT and now - self.writing_since > Var.STREAM_IDLE_TIMEOUT:
+            return "idle"
+
+        since, bytes_then, stalled_then = self._checkpoint
+        elapsed = now - since
+        if elapsed < Var.STREAM_SLOW_WINDOW:
+            return None
+        self._checkpoint = (now, self.bytes_sent, stalled)
+        rate = (self.bytes_sent - bytes_then) / elapsed
+        # Only blame the client when it, not Telegram, ate most of the window.
+        if Var.STREAM_MIN_KBPS and rate < Var.STREAM_MIN_KBPS * 1024 and stalled - stalled_then > elapsed / 2:
+            return "slow"
+        return None
+
+    def as_dict(self) -> dict:
+        return {
+            "message_id": self.message_id,
+            "client": f"bot{self.client_index + 1}",
+            "age_s": round(time.monotonic() - self.started),
+            "sent_mb": round(self.bytes_sent / 1024 / 1024, 2),
+            "queue_depth": self.queue_depth,
+            "buffered_mb": round(self.buffered_bytes / 1024 / 1024, 2),
+            "stalled_s": round(self.stalled_time, 2),
+            "upstream_wait_s": round(self.upstream_time, 2),
+        }
+
+
+class StreamRegistry:
+    """Responses that are currently streaming, keyed by ``StreamState.id``."""
+
+    def __init__(self):
+        self.streams: Dict[int, StreamState] = {}
+        self.reaped = {"idle": 0, "slow": 0}
+        self._reaper_task: Optional[asyncio.Task] = None
+
+    def open(self, message_id: int, client_index: int) -> StreamState:
+        state = StreamState(message_id, client_index)
+        self.streams[state.id] = state
+        if self._reaper_task is None or self._reaper_task.done():
+            self._reaper_task = asyncio.create_task(self._reap())
+        return state
+
+    async def _reap(self) -> None:
+        """Cancel responses whose client paused or reads too slowly.
+
+        Cancelling the handler closes the stream generator, which releases
+        its work_loads slot, read-ahead budget and media session requests.
+        """
+        while True:
+            await asyncio.sleep(REAP_INTERVAL)
+            now = time.monotonic()
+            for state in list(self.streams.values()):
+                reason = state.reap_reason(now)
+                if reason is None or state.task is None or state.task.done():
+                    continue
+                logger.info(
+                    f"Reaping {reason} stream of message {state.message_id} on bot{state.client_index + 1} "
+                    f"after {state.bytes_sent / 1024 / 1024:.1f} MB"
+                )
+                self.reaped[reason] += 1
+                self.streams.pop(state.id, None)
+                state.task.cancel()
+
+    def close(self, state: Optional[StreamState]) -> None:
+        if state is not None:
+            self.streams.pop(state.id, None)
+
+    def stats(self) -> dict:
+        return {
+            "memory": stream_budget.stats(),
+            "reaped": dict(self.reaped),
+            "connections": [state.as_dict() for state in self.streams.values()],
+        }
+
+
+stream_budget = MemoryBudget(Var.STREAM_MEMORY_LIMIT_MB * 1024 * 1024)
+active_streams = StreamRegistry()
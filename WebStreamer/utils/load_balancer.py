@@ -0,0 +1,122 @@
+# WebStreamer/utils/load_balancer.py
+import time
+import random
+import logging
+from typing import Callable, Dict, List, Optional, Set
+from pyrogram import Client
+from WebStreamer import Var
+from WebStreamer.bot import multi_clients, work_loads
+
+logger = logging.getLogger("load_balancer")
+
+# Clients that never streamed yet are assumed to manage this many bytes/s, so
+# score division stays sane and new clients are still worth trying.
+DEFAULT_THROUGHPUT = 1024 * 1024
+
+
+class ClientStats:
+    """Live streaming figures of one client used to score it."""
+
+    def __init__(self):
+        self.bytes_in_flight = 0
+        self.throughput = 0.0
+        self.flood_wait_until = 0.0
+        self._window_start = time.monotonic()
+        self._window_bytes = 0
+
+    def record(self, nbytes: int) -> None:
+        now = time.monotonic()
+        self._window_bytes += nbytes
+        elapsed = now - self._window_start
+        if elapsed >= 1:
+            rate = self._window_bytes / elapsed
+            self.throughput = rate if not self.throughput else 0.7 * self.throughput + 0.3 * rate
+            self._window_start = now
+            self._window_bytes = 0
+
+    @property
+    def cooling_down(self) -> bool:
+        return time.monotonic() < self.flood_wait_until
+
+    def drain_time(self) -> float:
+        return self.bytes_in_flight / max(self.throughput, DEFAULT_THROUGHPUT)
+
+    def as_dict(self) -> dict:
+        return {
+            "bytes_in_flight": self.bytes_in_flight,
+            "mb_per_s": round(self.throughput / 1024 / 1024, 2),
+            "flood_wait_s": max(round(self.flood_wait_until - time.monotonic()), 0),
+        }
+
+
+class LoadBalancer:
+    """Picks the client that serves a new stream.
+
+    Policies:
+      * ``least-connections`` - fewest active streams (``work_loads``)
+      * ``least-bytes`` - fewest bytes still to be sent
+      * ``power-of-two`` - best of two random clients by estimated drain time
+      * ``dc-affinity`` - prefer clients with a media session to the file's DC
+
+    Clients in a FloodWait cooldown are skipped unless every client is.
+    """
+
+    POLICIES = ("least-connections", "least-bytes", "power-of-two", "dc-affinity")
+
+    def __init__(self, policy: str):
+        if policy not in self.POLICIES:
+            logger.warning(f"Unknown load balancer policy '{policy}', using least-connections")
+            policy = "least-connections"
+        self.policy = policy
+        self.clients: Dict[int, ClientStats] = {}
+
+    def stats_for(self, index: int) -> ClientStats:
+        stats = self.clients.get(index)
+        if stats is None:
+            stats = self.clients[index] = ClientStats()
+        return stats
+
+    def index_of(self, client: Client) -> Optional[int]:
+        for index, candidate in multi_clients.items():
+            if candidate is client:
+                return index
+        return None
+
+    def note_flood_wait(self, client: Client, seconds: int) -> None:
+        index = self.index_of(client)
+        if index is not None:
+            stats = self.stats_for(index)
+            stats.flood_wait_until = max(stats.flood_wait_until, time.monotonic() + seconds)
+
+    def select(self, dc_id: Optional[int] = None, has_session: Optional[Callable[[Client, int], bool]] = None) -> int:
+        candidates: List[int] = [i for i in work_loads if not self.stats_for(i).cooling_down]
+        if not candidates:
+            candidates = list(work_loads)
+
+        if self.policy == "least-bytes":
+            return min(candidates, key=lambda i: (self.stats_for(i).bytes_in_flight, work_loads[i]))
+
+        if self.policy == "power-of-two":
+            pair = random.sample(candidates, 2) if len(candidates) > 1 else candidates
+            return min(pair, key=lambda i: (self.stats_for(i).drain_time(), work_loads[i]))
+
+        if self.policy == "dc-affinity" and dc_id is not None and has_session is not None:
+            warm = [i for i in candidates if has_session(multi_clients[i], dc_id)]
+            candidates = warm or candidates
+            return min(candidates, key=lambda i: (self.stats_for(i).drain_time(), work_loads[i]))
+
+        return min(candidates, key=work_loads.get)
+
+    def failover_candidates(self, exclude: Set[int]) -> List[int]:
+        """Healthy clients to take over a stalled stream, best first."""
+        candidates = [i for i in work_loads if i not in exclude and not self.stats_for(i).cooling_down]
+        return sorted(candidates, key=lambda i: (self.stats_for(i).drain_time(), work_loads[i]))
+
+    def stats(self) -> dict:
+        return {
+            "policy": self.policy,
+            "clients": {f"bot{i + 1}": self.stats_for(i).as_dict() for i in sorted(work_loads)},
+        }
+
+
+load_balancer = LoadBalancer(Var.LOAD_BALANCER)
@@ -0,0 +1,230 @@
+# WebStreamer/utils/media_pool.py
+import random
+import asyncio
+import logging
+import contextlib
+from typing import AsyncIterator, Dict, List, Optional
+from pyrogram import Client, raw
+from pyrogram.session import Session, Auth
+from pyrogram.errors import AuthBytesInvalid
+from WebStreamer.bot.database import delete_media_auth_key, get_media_auth_key, save_media_auth_key
+
+logger = logging.getLogger("media_pool")
+
+
+class MediaSessionPool:
+    """A pool of media sessions per DC for one client.
+
+    Requests go to the session with the fewest outstanding calls. A cold DC
+    answers as soon as its first session is up; the rest of the pool is
+    opened in the background. Sessions that fail are dropped and recreated
+    on demand; for foreign DCs the auth
+    key and the imported authorization are created once and shared by every
+    session in the pool. With USE_SESSION_FILE on, the key is also persisted
+    so later runs can skip the exchange.
+    """
+
+    def __init__(self, client: Client, size: int):
+        self.client = client
+        self.size = max(size, 1)
+        self.sessions: Dict[int, List[Session]] = {}
+        self.outstanding: Dict[Session, int] = {}
+        self.auth_keys: Dict[int, bytes] = {}
+        self._locks: Dict[int, asyncio.Lock] = {}
+        self._growing: Dict[int, asyncio.Task] = {}
+
+    async def get(self, dc_id: int) -> Session:
+        sessions = self.sessions.get(dc_id)
+        if not sessions:
+            await self.fill(dc_id, 1)
+            sessions = self.sessions[dc_id]
+        if len(sessions) < self.size:
+            # Open the remaining or discarded sessions in the background;
+            # callers keep using the ready ones meanwhile.
+            self._grow_later(dc_id)
+        return min(sessions, key=lambda s: self.outstanding.get(s, 0))
+
+    def _grow_later(self, dc_id: int) -> None:
+        task = self._growing.get(dc_id)
+        if task is None or task.done():
+            self._growing[dc_id] = asyncio.create_task(self._grow(dc_id))
+
+    async def _grow(self, dc_id: int) -> None:
+        try:
+            await self.fill(dc_id)
+        except Exception as e:
+            logger.warning(f"Could not grow media pool for DC {dc_id}: {e}")
+
+    def _lock(self, dc_id: int) -> asyncio.Lock:
+        return self._locks.setdefault(dc_id, asyncio.Lock())
+
+    @contextlib.asynccontextmanager
+    async def session(self, dc_id: int) -> AsyncIterator[Session]:
+        media_session = await self.get(dc_id)
+        self.outstanding[media_session] = self.outstanding.get(media_session, 0) + 1
+        try:
+            yield media_session
+        finally:
+            if media_session in self.outstanding:
+                self.outstanding[media_session] -= 1
+
+    async def fill(self, dc_id: int, target: Optional[int] = None) -> None:
+        """Open sessions until the pool for ``dc_id`` holds ``target`` (default: all).
+
+        The lock is taken per session, so a caller that only needs one
+        doesn't wait behind a background fill of the whole pool.
+        """
+        target = min(target or self.size, self.size)
+        sessions = self.sessions.setdefault(dc_id, [])
+        while len(sessions) < target:
+            async with self._lock(dc_id):
+                if len(sessions) >= target:
+                    break
+                try:
+                    media_session = await self._create_session(dc_id)
+                except Exception:
+                    if sessions:
+                        logger.warning(f"Could not grow media pool for DC {dc_id}", exc_info=True)
+                        break
+                    raise
+                sessions.append(media_session)
+                self.outstanding[media_session] = 0
+                self.client.media_sessions.setdefault(dc_id, sessions[0])
+        logger.debug(f"Media pool for DC {dc_id} has {len(sessions)} sessions")
+
+    async def _create_session(self, dc_id: int) -> Session:
+        test_mode = await self.client.storage.test_mode()
+        if dc_id == await self.client.storage.dc_id():
+            media_session = Session(
+                self.client, dc_id, await self.client.storage.auth_key(), test_mode, is_media=True
+            )
+            await media_session.start()
+            logger.debug(f"Created media session for DC {dc_id}")
+            return media_session
+
+        auth_key = self.auth_keys.get(dc_id)
+        if auth_key is not None:
+            media_session = Session(self.client, dc_id, auth_key, test_mode, is_media=True)
+            await media_session.start()
+            logger.debug(f"Created media session for DC {dc_id} with the pooled auth key")
+            return media_session
+
+        media_session = await self._restore_session(dc_id, test_mode)
+        if media_session is not None:
+            return media_session
+
+        media_session = Session(
+            self.client,
+            dc_id,
+            await Auth(self.client, dc_id, test_mode).create(),
+            test_mode,
+            is_media=True,
+        )
+        await media_session.start()
+
+        for _ in range(6):
+            exported_auth = await self.client.invoke(
+                raw.functions.auth.ExportAuthorization(dc_id=dc_id)
+            )
+
+            try:
+                await media_session.invoke(
+                    raw.functions.auth.ImportAuthorization(
+                        id=exported_auth.id, bytes=exported_auth.bytes
+                    )
+                )
+                break
+            except AuthBytesInvalid:
+                logger.debug(f"Invalid authorization bytes for DC {dc_id}")
+                continue
+        else:
+            await media_session.stop()
+            raise AuthBytesInvalid
+
+        self.auth_keys[dc_id] = media_session.auth_key
+        try:
+            await save_media_auth_key(await self.client.storage.user_id(), dc_id, test_mode, media_session.auth_key)
+        except Exception as e:
+            logger.warning(f"Could not persist auth key for DC {dc_id}: {e}")
+        logger.debug(f"Created media session for DC {dc_id}")
+        return media_session
+
+    async def _restore_session(self, dc_id: int, test_mode: bool) -> Optional[Session]:
+        """Reuse an auth key authorized on ``dc_id`` by a previous run.
+
+        The key is checked with a call that needs an authorized session; if
+        Telegram rejects it, it is forgotten and a fresh one gets created.
+        """
+        user_id = await self.client.storage.user_id()
+        auth_key = await get_media_auth_key(user_id, dc_id, test_mode)
+        if auth_key is None:
+            return None
+
+        media_session = Session(self.client, dc_id, auth_key, test_mode, is_media=True)
+        try:
+            await media_session.start()
+            await media_session.invoke(raw.functions.users.GetUsers(id=[raw.types.InputUserSelf()]))
+        except Exception as e:
+            logger.info(f"Stored auth key for DC {dc_id} is no longer valid: {e}")
+            with contextlib.suppress(Exception):
+                await media_session.stop()
+            await delete_media_auth_key(user_id, dc_id, test_mode)
+            return None
+
+        self.auth_keys[dc_id] = auth_key
+        logger.debug(f"Restored media session for DC {dc_id} from the stored auth key")
+        return media_session
+
+    async def discard(self, dc_id: int, media_session: Session) -> None:
+        """Drop a broken session; the next ``get`` replaces it."""
+        sessions = self.sessions.get(dc_id, [])
+        if media_session not in sessions:
+            return
+        sessions.remove(media_session)
+        self.outstanding.pop(media_session, None)
+        if self.client.media_sessions.get(dc_id) is media_session:
+            if sessions:
+                self.client.media_sessions[dc_id] = sessions[0]
+            else:
+                self.client.media_sessions.pop(dc_id, None)
+        logger.warning(f"Discarded broken media session for DC {dc_id}")
+        with contextlib.suppress(Exception):
+            await media_session.stop()
+
+    async def health_check(self, timeout: float = 10) -> None:
+        """Ping idle sessions and replace the ones that don't answer."""
+        for dc_id, sessions in list(self.sessions.items()):
+            for media_session in list(sessions):
+                if self.outstanding.get(media_session, 0):
+                    continue
+                try:
+                    await media_session.invoke(raw.functions.Ping(ping_id=random.getrandbits(63)), timeout=timeout)
+                except Exception as e:
+                    logger.debug(f"Media session for DC {dc_id} failed health check: {e}")
+                    await self.discard(dc_id, media_session)
+            if len(sessions) < self.size:
+                with contextlib.suppress(Exception):
+                    await self.fill(dc_id)
+
+    async def close(self) -> None:
+        """Stop every pooled session, not only the one pyrogram knows about."""
+        for task in self._growing.values():
+            task.cancel()
+        self._growing.clear()
+        for dc_id, sessions in self.sessions.items():
+            if self.client.media_sessions.get(dc_id) in sessions:
+                self.client.media_sessions.pop(dc_id, None)
+            for media_session in sessions:
+                with contextlib.suppress(Exception):
+                    await media_session.stop()
+        self.sessions.clear()
+        self.outstanding.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "media_sessions": sum(len(s) for s in self.sessions.values()),
+            "media_requests_in_flight": sum(self.outstanding.values()),
+        }
+
+    def has_dc(self, dc_id: int) -> bool:
+        return bool(self.sessions.get(dc_id))
@@ -57,6 +57,42 @@ class Var(object):
     PING_INTERVAL = int(getenv('PING_INTERVAL', '1200'))
     USE_SESSION_FILE = getenv('USE_SESSION_FILE', 'false').lower() == 'true'
 
+    # استریم: تعداد درخواست‌های GetFile همزمان برای هر بیننده
+    PREFETCH_WINDOW = max(int(getenv('PREFETCH_WINDOW', '4')), 1)
+    # سقف بافر پیش‌خوانی هر پاسخ و سقف کل حافظه بافر همه پاسخ‌ها (مگابایت، 0 = بدون سقف)
+    STREAM_BUFFER_MB = max(int(getenv('STREAM_BUFFER_MB', '8')), 1)
+    STREAM_MEMORY_LIMIT_MB = int(getenv('STREAM_MEMORY_LIMIT_MB', '256'))
+    # بستن استریم‌هایی که کاربر متوقف کرده (ثانیه) یا کندتر از حداقل سرعت (کیلوبایت بر ثانیه در بازه) می‌خواند، 0 = غیرفعال
+    STREAM_IDLE_TIMEOUT = int(getenv('STREAM_IDLE_TIMEOUT', '300'))
+    STREAM_MIN_KBPS = int(getenv('STREAM_MIN_KBPS', '8'))
+    STREAM_SLOW_WINDOW = max(int(getenv('STREAM_SLOW_WINDOW', '120')), 10)
+    # تعداد اتصال‌های مدیا برای هر دیتاسنتر در هر کلاینت
+    MEDIA_SESSIONS_PER_DC = max(int(getenv('MEDIA_SESSIONS_PER_DC', '2')), 1)
+    PREWARM_MEDIA_SESSIONS = getenv('PREWARM_MEDIA_SESSIONS', 'true').lower() == 'true'
+    # حداکثر زمان (ثانیه) گرم‌کردن اتصال‌های مدیا در پس‌زمینه بعد از شروع وب‌سرور
+    PREWARM_TIMEOUT = int(getenv('PREWARM_TIMEOUT', '60'))
+    # روش انتخاب کلاینت: least-connections, least-bytes, power-of-two, dc-affinity
+    LOAD_BALANCER = str(getenv('LOAD_BALANCER', 'dc-affinity')).lower()
+    # FloodWait طولانی‌تر از این مقدار (ثانیه) استریم را به کلاینت دیگری منتقل می‌کند
+    FLOOD_WAIT_FAILOVER = int(getenv('FLOOD_WAIT_FAILOVER', '5'))
+    # کش FileId پیام‌ها: حداکثر تعداد و مدت اعتبار (ثانیه)
+    FILE_ID_CACHE_SIZE = int(getenv('FILE_ID_CACHE_SIZE', '5000'))
+    FILE_ID_CACHE_TTL = int(getenv('FILE_ID_CACHE_TTL', '1800'))
+    # تقسیم دانلود فایل‌های بزرگ بین چند کلاینت (فقط در حالت چند توکنی)
+    STRIPE_CLIENTS = max(int(getenv('STRIPE_CLIENTS', '3')), 1)
+    STRIPE_MIN_SIZE_MB = int(getenv('STRIPE_MIN_SIZE_MB', '64'))
+    # کش قطعات فایل روی دیسک (0 = غیرفعال)
+    CHUNK_CACHE_DIR = str(getenv('CHUNK_CACHE_DIR', 'chunk_cache'))
+    CHUNK_CACHE_SIZE_MB = int(getenv('CHUNK_CACHE_SIZE_MB', '0'))
+    # کش اولین و آخرین قطعه فایل‌ها در حافظه (0 = غیرفعال)
+    MEMORY_CACHE_SIZE_MB = int(getenv('MEMORY_CACHE_SIZE_MB', '0'))
+    # تعداد اتصال‌های خواندن دائمی به دیتابیس
+    DB_READERS = max(int(getenv('DB_READERS', '4')), 1)
+    # ذخیره دسته‌ای بازدید لینک‌ها: هر چند ثانیه یا پس از چند بازدید، و مدت یک جلسه تماشا (ثانیه)
+    VIEWS_FLUSH_INTERVAL = max(int(getenv('VIEWS_FLUSH_INTERVAL', '5')), 1)
+    VIEWS_FLUSH_THRESHOLD = max(int(getenv('VIEWS_FLUSH_THRESHOLD', '500')), 1)
+    VIEW_SESSION_TTL = int(getenv('VIEW_SESSION_TTL', '1800'))
+
     HASH_LENGTH = int(getenv('HASH_LENGTH', '6'))
     ADMIN_USERNAME = getenv('ADMIN_USERNAME', 'admin')
 
@@ -0,0 +1,17 @@
+import os
+
+# WebStreamer.vars exits when the mandatory settings are missing; the tests
+# never talk to Telegram, so placeholders are enough. They are set before
+# load_dotenv runs, which leaves existing variables alone.
+for name, value in {
+    "API_ID": "1",
+    "API_HASH": "test",
+    "BOT_TOKEN": "1:test",
+    "OWNER_ID": "1",
+    "BIN_CHANNEL": "-1001",
+    "ADMIN_PASSWORD_HASH": "test",
+    # The tracked .env template leaves these blank, which int() rejects.
+    "PORT": "8080",
+    "PUBLIC_PORT": "8080",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,128 @@
+import asyncio
+import sqlite3
+import datetime
+
+import pytest
+
+from WebStreamer.bot import database
+from WebStreamer.bot.database import MIGRATIONS
+
+
+def create_db(path) -> sqlite3.Connection:
+    """Create a database the way the bot does on startup and open it."""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(database, "DB_PATH", str(path))
+
+        async def init():
+            await database.init_db()
+            await database.close_db()
+
+        asyncio.run(init())
+    return sqlite3.connect(path)
+
+
+@pytest.fixture(scope="module")
+def db(tmp_path_factory):
+    conn = create_db(tmp_path_factory.mktemp("db") / "database.sqlite3")
+    start = datetime.datetime(2024, 1, 1)
+    # init_db already added the owner (OWNER_ID=1 in conftest).
+    conn.executemany(
+        "INSERT INTO users (id, first_name, join_date) VALUES (?, ?, ?)",
+        [(i, f"user{i}", start + datetime.timedelta(hours=i)) for i in range(2, 201)],
+    )
+    conn.executemany(
+        "INSERT INTO links (user_id, file_name, file_unique_id, is_active, creation_date) VALUES (?, ?, ?, ?, ?)",
+        [
+            (i % 200 + 1, f"movie {i}.mkv", f"u{i}", int(i % 10 != 0), start + datetime.timedelta(minutes=i))
+            for i in range(20000)
+        ],
+    )
+    # Plans are checked against a populated database, not the empty one
+    # the migrations analyzed.
+    conn.execute("ANALYZE")
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def plan(db, sql, params=()):
+    return " | ".join(row[3] for row in db.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+
+
+def test_user_version_matches_migrations(db):
+    assert db.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+
+
+def test_migrations_are_idempotent(tmp_path):
+    path = tmp_path / "database.sqlite3"
+    create_db(path).close()
+    # A restart runs init_db on an up-to-date database again.
+    conn = create_db(path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+    for statements in MIGRATIONS:
+        for statement in statements:
+            conn.execute(statement)
+    conn.close()
+
+
+def test_user_links_page_uses_index(db):
+    detail = plan(
+        db,
+        "SELECT id, file_name, file_size_mb, views FROM links WHERE user_id = ? AND is_active = 1"
+        " AND (creation_date, id) < (?, ?) ORDER BY creation_date DESC, id DESC LIMIT ?",
+        (5, "2024-01-10 00:00:00", 100, 6),
+    )
+    assert "idx_links_user_active_created" in detail
+    assert "TEMP B-TREE" not in detail
+
+
+def test_user_link_count_uses_index(db):
+    detail = plan(db, "SELECT COUNT(id) FROM links WHERE user_id = ? AND is_active = 1", (5,))
+    assert "COVERING INDEX idx_links_user_active_created" in detail
+
+
+def test_all_links_for_user_uses_index(db):
+    detail = plan(
+        db,
+        "SELECT * FROM links WHERE user_id = ? AND is_active = 1 ORDER BY creation_date DESC, id DESC",
+        (5,),
+    )
+    assert "idx_links_user_active_created" in detail
+    assert "TEMP B-TREE" not in detail
+
+
+def test_admin_link_search_uses_index(db):
+    detail = plan(
+        db,
+        "SELECT l.*, u.id as user_id, u.first_name, u.username FROM links l JOIN users u ON l.user_id = u.id"
+        " WHERE l.is_active = ? ORDER BY l.creation_date DESC, l.id DESC LIMIT ?",
+        (1, 51),
+    )
+    assert "idx_links_active_created" in detail
+    assert "TEMP B-TREE" not in detail
+
+
+def test_daily_uploads_uses_index(db):
+    detail = plan(
+        db,
+        "SELECT DATE(creation_date) as date, COUNT(id) as count FROM links"
+        " WHERE creation_date >= DATE('now', '-7 days') GROUP BY date ORDER BY date ASC",
+    )
+    assert "idx_links_created" in detail
+
+
+def test_users_page_uses_index(db):
+    detail = plan(db, "SELECT * FROM users WHERE 1 ORDER BY join_date DESC, id DESC LIMIT ?", (51,))
+    assert "idx_users_join_date" in detail
+    assert "TEMP B-TREE" not in detail
+
+
+def test_file_name_search_uses_fts(db):
+    detail = plan(
+        db,
+        "SELECT id FROM links WHERE user_id = ? AND is_active = 1"
+        " AND id IN (SELECT rowid FROM links_fts WHERE links_fts MATCH ?)",
+        (5, '"movie"*'),
+    )
+    assert "links_fts VIRTUAL TABLE INDEX" in detail
+    assert db.execute("SELECT COUNT(*) FROM links_fts WHERE links_fts MATCH ?", ('"mov"*',)).fetchone()[0] == 20000